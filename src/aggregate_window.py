@@ -1,8 +1,10 @@
 import colorcet as cc
-import matplotlib.pyplot as plt
+
+from functools import lru_cache
 
 from ui_elements import BaseWindow, FigureWindow, ClickableWidget
-from plotting_utils import get_color_cycle
+from plot_data import plot_cache
+from plotting_utils import get_color_cycle, uncertainty_band
 
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont
@@ -29,6 +31,45 @@ colorcet_cmaps = {
     "Rainbow": cc.m_rainbow4,
 }
 
+# Columns and axis labels of the aggregate views
+AGGREGATE_VIEWS = {
+    "CVs": {
+        "x": "Average Potential (V)",
+        "y": "Average Current (mA)",
+        "yerr": "Current Stand Dev (mA)",
+        "xlabel": "Potential (V)",
+        "ylabel": "Average Current (mA)",
+    },
+    "disp_V": {
+        "x": "Average Potential (V)",
+        "y": "Average Displacement (%)",
+        "yerr": "Displacement Stand Dev (%)",
+        "xlabel": "Potential (V)",
+        "ylabel": "Average Displacement (%)",
+    },
+    "disp_Q": {
+        "x": "Average Charge (C)",
+        "y": "Average Displacement (%)",
+        "yerr": "Displacement Stand Dev (%)",
+        "xlabel": "Charge (C)",
+        "ylabel": "Average Displacement (%)",
+    },
+    "disp_t": {
+        "x": "Average Time (s)",
+        "y": "Average Displacement (%)",
+        "yerr": "Displacement Stand Dev (%)",
+        "xlabel": "Time (s)",
+        "ylabel": "Average Displacement (%)",
+    },
+}
+
+
+@lru_cache(maxsize=None)
+def palette(name, n_colors):
+    # Colors for n_colors datasets from a dropdown colormap name, resolved once
+    cmap = colorcet_cmaps.get(name, name)
+    return tuple(tuple(color["color"]) for color in get_color_cycle(cmap, n_colors))
+
 
 class AggregateWindow(BaseWindow):
     def __init__(self, aggregate_data, parent=None):
@@ -75,7 +116,7 @@ class AggregateWindow(BaseWindow):
         self.color_dropdown.setFont(QFont("Arial", 9))
         button_layout.addWidget(self.color_dropdown)
 
-        self.color_dropdown.currentIndexChanged.connect(self.update_plots)
+        self.color_dropdown.currentIndexChanged.connect(self.recolor)
 
         buttons = QWidget()
         stack = QWidget()
@@ -84,9 +125,12 @@ class AggregateWindow(BaseWindow):
         buttons.setLayout(button_layout)
         buttons.setFixedWidth(175)
 
-        keys = ["CVs", "disp_V", "disp_Q", "disp_t"]
+        keys = list(AGGREGATE_VIEWS)
         self.main_displays = {}
         self.preview_widgets = {}
+        # (line, uncertainty band, preview line) of every dataset, per view
+        self.artists = {key: [] for key in keys}
+        self.built = False
 
         button_labels = [
             QLabel("Voltammograms"),
@@ -125,135 +169,63 @@ class AggregateWindow(BaseWindow):
         self.stack_layout.setCurrentIndex(clicked)
 
     def update_plots(self):
-        color_cat = self.color_dropdown.currentText()
-        if color_cat in colorcet_cmaps:
-            color_cat = colorcet_cmaps[color_cat]
-
-        plt.rcParams["axes.prop_cycle"] = get_color_cycle(color_cat, len(self.data))
-        colors = [color for color in plt.rcParams["axes.prop_cycle"]]
-
-        # Clear all current axes to allow for updates
-        self.main_displays["CVs"].axes.clear()
-        self.preview_widgets["CVs"].axes.clear()
-
-        self.main_displays["disp_V"].axes.clear()
-        self.preview_widgets["disp_V"].axes.clear()
-
-        self.main_displays["disp_Q"].axes.clear()
-        self.preview_widgets["disp_Q"].axes.clear()
-
-        self.main_displays["disp_t"].axes.clear()
-        self.preview_widgets["disp_t"].axes.clear()
-
-        # Replot updated data
-        for i, key in enumerate(self.data):
-            self.main_displays["CVs"].axes.plot(
-                self.data[key].averaged_data["Average Potential (V)"],
-                self.data[key].averaged_data["Average Current (mA)"],
-                color=colors[i]["color"],
-                label=key,
-            )
-            self.main_displays["CVs"].axes.errorbar(
-                self.data[key].averaged_data["Average Potential (V)"],
-                self.data[key].averaged_data["Average Current (mA)"],
-                yerr=self.data[key].averaged_data["Current Stand Dev (mA)"],
-                alpha=0.2,
-                color=colors[i]["color"],
-            )
-            self.main_displays["CVs"].axes.legend()
-            self.main_displays["CVs"].axes.set_xlabel("Potential (V)")
-            self.main_displays["CVs"].axes.set_ylabel("Average Current (mA)")
-
-            self.preview_widgets["CVs"].axes.plot(
-                self.data[key].averaged_data["Average Potential (V)"],
-                self.data[key].averaged_data["Average Current (mA)"],
-                color=colors[i]["color"],
-            )
-
-        for i, key in enumerate(self.data):
-            self.main_displays["disp_V"].axes.plot(
-                self.data[key].averaged_data["Average Potential (V)"],
-                self.data[key].averaged_data["Average Displacement (%)"],
-                color=colors[i]["color"],
-                label=key,
-            )
-            self.main_displays["disp_V"].axes.errorbar(
-                self.data[key].averaged_data["Average Potential (V)"],
-                self.data[key].averaged_data["Average Displacement (%)"],
-                yerr=self.data[key].averaged_data["Displacement Stand Dev (%)"],
-                errorevery=2,
-                color=colors[i]["color"],
-                alpha=0.05,
-            )
-            self.main_displays["disp_V"].axes.legend()
-            self.main_displays["disp_V"].axes.set_xlabel("Potential (V)")
-            self.main_displays["disp_V"].axes.set_ylabel("Average Displacement (%)")
-
-            self.preview_widgets["disp_V"].axes.plot(
-                self.data[key].averaged_data["Average Potential (V)"],
-                self.data[key].averaged_data["Average Displacement (%)"],
-                color=colors[i]["color"],
-            )
-
-        for i, key in enumerate(self.data):
-            self.main_displays["disp_Q"].axes.plot(
-                self.data[key].averaged_data["Average Charge (C)"],
-                self.data[key].averaged_data["Average Displacement (%)"],
-                color=colors[i]["color"],
-                label=key,
-            )
-            self.main_displays["disp_Q"].axes.errorbar(
-                self.data[key].averaged_data["Average Charge (C)"],
-                self.data[key].averaged_data["Average Displacement (%)"],
-                yerr=self.data[key].averaged_data["Displacement Stand Dev (%)"],
-                errorevery=2,
-                color=colors[i]["color"],
-                alpha=0.05,
-            )
-            self.main_displays["disp_Q"].axes.legend()
-            self.main_displays["disp_Q"].axes.set_xlabel("Charge (C)")
-            self.main_displays["disp_Q"].axes.set_ylabel("Average Displacement (%)")
-
-            self.preview_widgets["disp_Q"].axes.plot(
-                self.data[key].averaged_data["Average Charge (C)"],
-                self.data[key].averaged_data["Average Displacement (%)"],
-                color=colors[i]["color"],
-            )
-
-        for i, key in enumerate(self.data):
-            self.main_displays["disp_t"].axes.plot(
-                self.data[key].averaged_data["Average Time (s)"],
-                self.data[key].averaged_data["Average Displacement (%)"],
-                color=colors[i]["color"],
-                label=key,
-            )
-            self.main_displays["disp_t"].axes.errorbar(
-                self.data[key].averaged_data["Average Time (s)"],
-                self.data[key].averaged_data["Average Displacement (%)"],
-                yerr=self.data[key].averaged_data["Displacement Stand Dev (%)"],
-                errorevery=2,
-                color=colors[i]["color"],
-                alpha=0.05,
-            )
-            self.main_displays["disp_t"].axes.legend()
-            self.main_displays["disp_t"].axes.set_xlabel("Time (s)")
-            self.main_displays["disp_t"].axes.set_ylabel("Average Displacement (%)")
-
-            self.preview_widgets["disp_t"].axes.plot(
-                self.data[key].averaged_data["Average Time (s)"],
-                self.data[key].averaged_data["Average Displacement (%)"],
-                color=colors[i]["color"],
-            )
-
-        # Update displayed plots in GUI
-        self.main_displays["CVs"].canvas.draw_idle()
-        self.preview_widgets["CVs"].draw_idle()
-
-        self.main_displays["disp_V"].canvas.draw_idle()
-        self.preview_widgets["disp_V"].draw_idle()
-
-        self.main_displays["disp_Q"].canvas.draw_idle()
-        self.preview_widgets["disp_Q"].draw_idle()
-
-        self.main_displays["disp_t"].canvas.draw_idle()
-        self.preview_widgets["disp_t"].draw_idle()
+        # Plots are built once, later colormap changes only recolor the artists
+        if not self.built:
+            self.build_plots()
+        self.recolor()
+
+    def build_plots(self):
+        for view, spec in AGGREGATE_VIEWS.items():
+            main_axes = self.main_displays[view].axes
+            preview_axes = self.preview_widgets[view].axes
+
+            for key in self.data:
+                plot_data = plot_cache.get(self.data[key])
+                x = plot_data[spec["x"]]
+                y = plot_data[spec["y"]]
+
+                (line,) = main_axes.plot(x, y, label=key)
+                band = uncertainty_band(
+                    main_axes, x, y, plot_data[spec["yerr"]], alpha=0.2
+                )
+                (preview,) = preview_axes.plot(x, y)
+                self.artists[view].append((line, band, preview))
+
+            main_axes.set_xlabel(spec["xlabel"])
+            main_axes.set_ylabel(spec["ylabel"])
+
+            # The previews have no bands, their limits are the precomputed data limits
+            xlim, ylim = self.data_limits(spec["x"]), self.data_limits(spec["y"])
+            if xlim and ylim:
+                preview_axes.set_xlim(xlim)
+                preview_axes.set_ylim(ylim)
+
+        self.built = True
+
+    def data_limits(self, name):
+        # (min, max) of a quantity over all datasets, padded like autoscaling
+        limits = [plot_cache.get(data).limits.get(name) for data in self.data.values()]
+        limits = [limit for limit in limits if limit is not None]
+        if not limits:
+            return None
+
+        low = min(limit[0] for limit in limits)
+        high = max(limit[1] for limit in limits)
+        pad = 0.05 * (high - low)
+        return low - pad, high + pad
+
+    def recolor(self):
+        colors = palette(self.color_dropdown.currentText(), len(self.data))
+
+        for view in AGGREGATE_VIEWS:
+            for color, (line, band, preview) in zip(colors, self.artists[view]):
+                line.set_color(color)
+                band.set_color(color)
+                preview.set_color(color)
+
+            # Legend handles are copies, make a new legend with the current colors
+            if self.data:
+                self.main_displays[view].axes.legend()
+
+            self.main_displays[view].canvas.draw_idle()
+            self.preview_widgets[view].draw_idle()
@@ -0,0 +1,177 @@
+import numpy as np
+import pandas as pd
+
+
+def cycle_matrix(values, codes, positions):
+    # Scatter rows of a (rows x channels) array into a NaN padded
+    # (cycles x max cycle length x channels) buffer in one pass
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, None]
+
+    buffer = np.full(
+        (codes.max() + 1, positions.max() + 1, values.shape[1]),
+        np.nan,
+    )
+    buffer[codes, positions] = values
+    return buffer
+
+
+def resample_cycles(values, codes, phase, grid_points):
+    """
+    Interpolate every cycle of a (rows x channels) array onto a common grid of
+    normalized cycle time (phase 0..1), giving a dense (cycles x grid_points x channels)
+    array. Rows must be grouped by cycle with increasing phase.
+    """
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, None]
+    n_cycles = codes.max() + 1
+
+    # Cycle c is laid out on [2c, 2c + 1], the gaps keep neighbouring cycles apart
+    # so a single np.interp call per channel resamples all cycles
+    x = 2 * codes.astype(float) + phase
+    grid = (2 * np.arange(n_cycles)[:, None] + np.linspace(0, 1, grid_points)).ravel()
+
+    resampled = np.empty((len(grid), values.shape[1]))
+    for channel in range(values.shape[1]):
+        resampled[:, channel] = np.interp(grid, x, values[:, channel])
+    return resampled.reshape(n_cycles, grid_points, values.shape[1])
+
+
+def cycle_lags(traces, reference):
+    """
+    Lag in samples of every row of a (cycles x samples) array against a reference
+    trace, from the peak of their cross-correlation computed with FFTs (O(n log n)
+    per cycle). NaN padding is ignored.
+    """
+    traces = np.atleast_2d(traces)
+    n = max(traces.shape[1], len(reference))
+    nfft = 1 << (2 * n - 1).bit_length()
+
+    def correlate(x, y):
+        spectrum = np.fft.rfft(x, nfft, axis=-1) * np.conj(np.fft.rfft(y, nfft))
+        return np.fft.irfft(spectrum, nfft, axis=-1)
+
+    valid_traces = ~np.isnan(traces)
+    valid_reference = ~np.isnan(reference)
+    traces = np.nan_to_num(traces - np.nanmean(traces, axis=1, keepdims=True))
+    reference = np.nan_to_num(reference - np.nanmean(reference))
+
+    # Correlation normalized by the energy of the overlapping parts, otherwise lags
+    # that drop high amplitude samples at the cycle edges are penalized. Lags
+    # overlapping less than half of a cycle are never picked
+    overlap = np.rint(correlate(valid_traces, valid_reference))
+    energy = correlate(traces**2, valid_reference) * correlate(
+        valid_traces, reference**2
+    )
+    score = correlate(traces, reference) / np.sqrt(np.maximum(energy, 1e-300))
+    score[overlap < overlap.max(axis=1, keepdims=True) / 2] = -np.inf
+
+    lags = np.argmax(score, axis=1)
+    # Circular correlation, the upper half holds the negative lags
+    return np.where(lags > nfft // 2, lags - nfft, lags)
+
+
+def shift_cycles(buffer, lags):
+    # Shift every cycle of a (cycles x samples x channels) buffer back by its lag,
+    # samples shifted in from outside the cycle are NaN. The buffer is extended so
+    # cycles shifted forward keep their last samples
+    lags = np.asarray(lags)
+    n = buffer.shape[1]
+    source = np.arange(n - min(lags.min(initial=0), 0)) + lags[:, None]
+    inside = (source >= 0) & (source < n)
+
+    shifted = buffer[np.arange(len(buffer))[:, None], np.clip(source, 0, n - 1)]
+    shifted[~inside] = np.nan
+
+    # Drop trailing samples no cycle reaches anymore
+    filled = np.flatnonzero(~np.isnan(shifted[:, :, 0]).all(axis=0))
+    return shifted[:, : filled[-1] + 1 if len(filled) else 0]
+
+
+def nan_mean_std(buffer):
+    # Mean/std dev over the cycle axis for every sample position and channel,
+    # padding from shorter cycles is ignored
+    return np.nanmean(buffer, axis=0), np.nanstd(buffer, axis=0)
+
+
+class CycleAccumulator:
+    # Running per-sample-position mean/std dev over cycles pushed one at a time
+    # (Welford's online algorithm), so cycles can be averaged without holding all of
+    # them in memory. Memory grows with the cycle length, not the number of cycles
+    def __init__(self, n_channels):
+        self.count = np.zeros((0, n_channels), dtype=np.int64)
+        self.mean = np.zeros((0, n_channels))
+        self.m2 = np.zeros((0, n_channels))
+
+    def __len__(self):
+        return len(self.count)
+
+    def grow(self, length):
+        extra = length - len(self.count)
+        if extra <= 0:
+            return
+        pad = np.zeros((extra, self.mean.shape[1]))
+        self.count = np.concatenate([self.count, pad.astype(np.int64)])
+        self.mean = np.concatenate([self.mean, pad])
+        self.m2 = np.concatenate([self.m2, pad])
+
+    def push(self, values):
+        # values: (cycle length x channels) array for one cycle
+        values = np.asarray(values, dtype=float)
+        n = len(values)
+        self.grow(n)
+
+        # NaN samples (e.g. padding from cycle alignment) are left out like in nan_mean_std
+        valid = ~np.isnan(values)
+        self.count[:n] += valid
+        delta = np.where(valid, values - self.mean[:n], 0)
+        self.mean[:n] += delta / np.maximum(self.count[:n], 1)
+        self.m2[:n] += delta * np.where(valid, values - self.mean[:n], 0)
+
+    def result(self):
+        # Population std dev, same as nan_mean_std. Trailing positions no cycle
+        # reached (only NaN samples were pushed there) are dropped
+        filled = np.flatnonzero(self.count[:, 0])
+        n = filled[-1] + 1 if len(filled) else 0
+        count = self.count[:n]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(count > 0, self.mean[:n], np.nan), np.sqrt(
+                self.m2[:n] / count
+            )
+
+    def frame(self):
+        # Averaged data table of everything pushed so far, see averaged_frame
+        return averaged_frame(*self.result())
+
+
+def averaged_frame(avg, dev):
+    """
+    Build the averaged data table from (samples x channels) mean/std dev arrays,
+    channels ordered time, potential, current, charge, displacement, % displacement.
+    """
+    avg_time, avg_potential, avg_current, avg_charge, avg_disp, avg_percent_disp = avg.T
+    _, _, dev_current, dev_charge, dev_disp, dev_percent_disp = dev.T
+
+    # Renormalize displacement to first value
+    avg_disp = avg_disp - avg_disp[0]
+    avg_percent_disp = avg_percent_disp - avg_percent_disp[0]
+
+    averaged_data = pd.DataFrame(
+        {
+            "Average Time (s)": avg_time,
+            "Average Potential (V)": avg_potential,
+            "Average Current (mA)": avg_current,
+            "Current Stand Dev (mA)": dev_current,
+            "Average Charge (C)": avg_charge,
+            "Charge Stand Dev (C)": dev_charge,
+            "Average Displacement (um)": avg_disp,
+            "Displacement Stand Dev (um)": dev_disp,
+            "Average Displacement (%)": avg_percent_disp,
+            "Displacement Stand Dev (%)": dev_percent_disp,
+        }
+    )
+
+    averaged_data["ox/red"] = np.where(avg_current < 0, 0, 1)
+    return averaged_data
@@ -0,0 +1,112 @@
+import time as timer
+
+import numpy as np
+
+from scipy.interpolate import UnivariateSpline, interp1d
+
+from cycle_index import CycleIndex
+
+
+def fit_cubic(times, values):
+    return interp1d(times, values, kind="cubic", fill_value="extrapolate")
+
+
+def fit_linear(times, values):
+    return interp1d(times, values, kind="linear", fill_value="extrapolate")
+
+
+def fit_smoothing_spline(times, values):
+    # Smoothing factor from the point-to-point scatter of the fitted points, for white
+    # noise the variance of the differences is twice the noise variance
+    s = len(values) * np.var(np.diff(values)) / 2
+    return UnivariateSpline(times, values, k=3, s=s, ext=0)
+
+
+# Baseline fitting engines selectable with Dilatometry(baseline_method=...). Each one
+# fits the per-cycle maxima or minima ("points") of the displacement and returns a
+# callable evaluated over the full time vector in one call. "min_points" is the number
+# of points the fit needs, live mode falls back to lower order fits until it has them
+BASELINE_ENGINES = {
+    "cubic": {
+        "fit": fit_cubic,
+        "points": "maxima",
+        "min_points": 4,
+    },
+    "smoothing spline": {
+        "fit": fit_smoothing_spline,
+        "points": "maxima",
+        "min_points": 4,
+    },
+    "linear": {
+        "fit": fit_linear,
+        "points": "maxima",
+        "min_points": 2,
+    },
+    "lower envelope": {
+        "fit": fit_cubic,
+        "points": "minima",
+        "min_points": 4,
+    },
+}
+
+
+def register_baseline_engine(name, fit, points="maxima", min_points=2):
+    """
+    Add a baseline engine, fit(times, values) has to return a callable of time.
+    """
+    if points not in ("maxima", "minima"):
+        raise ValueError("Baseline engines fit either the cycle maxima or minima")
+    BASELINE_ENGINES[name] = {"fit": fit, "points": points, "min_points": min_points}
+
+
+def get_baseline_engine(name):
+    try:
+        return BASELINE_ENGINES[name]
+    except KeyError:
+        raise ValueError(f"Unknown baseline method: {name}") from None
+
+
+def extremum_rows(index, values, points):
+    # Row of the maximum/minimum of every cycle of a CycleIndex
+    return index.argmax(values) if points == "maxima" else index.argmin(values)
+
+
+def extremum_row(values, points):
+    # Row of the maximum/minimum of a single cycle
+    return np.argmax(values) if points == "maxima" else np.argmin(values)
+
+
+def benchmark(n_cycles=10_000, cycle_length=500, repeat=3):
+    """
+    Time per-cycle point extraction and every baseline engine on a synthetic file
+    of n_cycles cycles, e.g. python baseline.py
+    """
+    rng = np.random.default_rng(0)
+    n_rows = n_cycles * cycle_length
+    time = np.arange(n_rows, dtype=float)
+    phase = 2 * np.pi * np.arange(n_rows) / cycle_length
+    disp = np.sin(phase) + 1e-5 * time + 0.01 * rng.standard_normal(n_rows)
+    cycles = np.repeat(np.arange(n_cycles), cycle_length)
+
+    def best_of(func):
+        elapsed = []
+        for _ in range(repeat):
+            start = timer.perf_counter()
+            func()
+            elapsed.append(timer.perf_counter() - start)
+        return min(elapsed)
+
+    index = CycleIndex(cycles)
+    print(f"{n_cycles} cycles, {n_rows} rows")
+    print(f"{'cycle index':>20}: {best_of(lambda: CycleIndex(cycles)):.4f} s")
+    print(f"{'maxima':>20}: {best_of(lambda: index.argmax(disp)):.4f} s")
+    print(f"{'minima':>20}: {best_of(lambda: index.argmin(disp)):.4f} s")
+
+    for name, engine in BASELINE_ENGINES.items():
+        rows = extremum_rows(index, disp, engine["points"])[1:]
+        elapsed = best_of(lambda: engine["fit"](time[rows], disp[rows])(time))
+        print(f"{name:>20}: {elapsed:.4f} s")
+
+
+if __name__ == "__main__":
+    benchmark()
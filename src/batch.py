@@ -0,0 +1,88 @@
+import multiprocessing
+import os
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from data_cache import default_cache
+from dilatometry import Dilatometry
+
+
+def process_file(file_str, ref_thickness, cache=default_cache, stream=False, **options):
+    """
+    Run the full processing chain for a single file. With stream=True the file
+    is processed in bounded memory and only the averaged data is kept. Other
+    options (baseline_method, dtype, ...) are passed on to Dilatometry.
+    """
+    data = Dilatometry(ref_thickness=ref_thickness, **options)
+    if stream:
+        data.stream_data(file_str=file_str)
+    else:
+        data.load_data(file_str=file_str, cache=cache)
+    data.run()
+    return data
+
+
+def duplicate_labels(file_specs):
+    # Labels used by more than one spec, in order of first repeat
+    seen, duplicates = set(), []
+    for label, *_ in file_specs:
+        if label in seen and label not in duplicates:
+            duplicates.append(label)
+        seen.add(label)
+    return duplicates
+
+
+def process_files(
+    file_specs,
+    workers=None,
+    on_result=None,
+    cache=default_cache,
+    stream=False,
+    **options,
+):
+    """
+    Process (label, file path, reference thickness) specs, in parallel worker
+    processes when more than one worker is available. Results are returned as
+    a dict in the same order as file_specs, on_result(label, done, total) is
+    called as each file finishes. Labels have to be unique.
+    """
+    duplicates = duplicate_labels(file_specs)
+    if duplicates:
+        raise ValueError(f"Duplicate file labels: {', '.join(duplicates)}")
+
+    total = len(file_specs)
+    workers = min(workers or os.cpu_count() or 1, total)
+    results = [None] * total
+
+    if workers <= 1:
+        for i, (label, file_str, ref_thickness) in enumerate(file_specs):
+            results[i] = process_file(file_str, ref_thickness, cache, stream, **options)
+            if on_result:
+                on_result(label, i + 1, total)
+    else:
+        # Spawn instead of fork on every platform, forking the multithreaded GUI
+        # process (Qt, matplotlib) can deadlock the children on inherited locks
+        pool = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        try:
+            futures = {
+                pool.submit(
+                    process_file,
+                    file_str,
+                    ref_thickness,
+                    cache,
+                    stream,
+                    **options,
+                ): i
+                for i, (_, file_str, ref_thickness) in enumerate(file_specs)
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                i = futures[future]
+                results[i] = future.result()
+                if on_result:
+                    on_result(file_specs[i][0], done, total)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    return {spec[0]: result for spec, result in zip(file_specs, results)}
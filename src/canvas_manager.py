@@ -0,0 +1,72 @@
+from collections import OrderedDict
+
+# Rendered figures kept alive at a time and their total estimated memory
+MAX_FIGURES = 12
+MAX_FIGURE_BYTES = 256 * 1024**2
+
+
+def figure_nbytes(fig):
+    # Estimated memory of a rendered figure: its RGBA Agg buffer plus the vertices
+    # of the drawn lines and collections (uncertainty bands)
+    width, height = fig.bbox.size
+    nbytes = int(width * height) * 4
+    for axes in fig.axes:
+        for line in axes.lines:
+            nbytes += line.get_xydata().nbytes
+        for collection in axes.collections:
+            nbytes += sum(path.vertices.nbytes for path in collection.get_paths())
+    return nbytes
+
+
+class CanvasManager:
+    # Figures ordered by when they were last viewed. Once more than max_figures are
+    # alive or their estimated memory exceeds max_bytes, the least recently viewed
+    # ones are released through their callback, which drops the figure (Agg buffer
+    # and artists) so it is rebuilt from the retained numeric data when shown again.
+    # The most recently viewed figure is never released
+    def __init__(self, max_figures=MAX_FIGURES, max_bytes=MAX_FIGURE_BYTES):
+        self.max_figures = max_figures
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    @property
+    def nbytes(self):
+        return sum(nbytes for _, nbytes in self.entries.values())
+
+    def add(self, key, fig, release):
+        """
+        Register a newly built figure as the most recently viewed one.
+        release() is called when it is evicted.
+        """
+        self.entries[key] = (release, figure_nbytes(fig))
+        self.entries.move_to_end(key)
+        self.evict()
+
+    def touch(self, key):
+        # Mark a figure as viewed
+        if key in self.entries:
+            self.entries.move_to_end(key)
+
+    def replace(self, key, fig):
+        # A registered figure was rebuilt in place (e.g. live data), keep its position
+        if key in self.entries:
+            release, _ = self.entries[key]
+            self.entries[key] = (release, figure_nbytes(fig))
+            self.evict()
+
+    def discard(self, key):
+        # The figure was removed by its owner, nothing to release
+        self.entries.pop(key, None)
+
+    def evict(self):
+        while len(self.entries) > 1 and (
+            len(self.entries) > self.max_figures or self.nbytes > self.max_bytes
+        ):
+            _, (release, _) = self.entries.popitem(last=False)
+            release()
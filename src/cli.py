@@ -0,0 +1,239 @@
+"""
+Headless batch processing of EC-Lab dilatometry files.
+
+Processes files without a display and writes the same three excel workbooks as
+the "Export Data" button. Only the processing and export modules are imported,
+never PyQt5 or a Qt matplotlib backend.
+
+Examples:
+    python cli.py -f scan_5mV.mpt "5 mV/s" 85 -f scan_10mV.mpt "10 mV/s" 85 -o results
+    python cli.py -d nightly/ -t 85 -w 8 -o nightly/results
+    python cli.py -m manifest.csv -o results
+
+A manifest is a CSV file with a header row and "file", "label" and (optionally)
+"thickness" columns. Relative paths are resolved against the manifest's folder.
+"""
+
+import argparse
+import csv
+import os
+import sys
+
+from baseline import BASELINE_ENGINES
+from batch import duplicate_labels, process_files
+from data_cache import default_cache
+from dilatometry import AVERAGE_MODES
+from file_export import export_data
+
+EC_LAB_EXTENSIONS = (".mpt", ".txt")
+
+
+def read_manifest(manifest, default_thickness):
+    specs = []
+    base_dir = os.path.dirname(os.path.abspath(manifest))
+
+    with open(manifest, newline="") as f:
+        for line, row in enumerate(csv.DictReader(f), start=2):
+            file_str = os.path.join(base_dir, row["file"].strip())
+            label = (row.get("label") or "").strip() or os.path.splitext(
+                os.path.basename(file_str)
+            )[0]
+            thickness = (row.get("thickness") or "").strip()
+
+            if thickness:
+                ref_thickness = float(thickness)
+            elif default_thickness is not None:
+                ref_thickness = default_thickness
+            else:
+                raise ValueError(
+                    f"{manifest}, line {line}: no thickness given and no --thickness default"
+                )
+
+            specs.append((label, file_str, ref_thickness))
+
+    return specs
+
+
+def read_directory(directory, ref_thickness):
+    return [
+        (os.path.splitext(name)[0], os.path.join(directory, name), ref_thickness)
+        for name in sorted(os.listdir(directory))
+        if name.lower().endswith(EC_LAB_EXTENSIONS)
+    ]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Process EC-Lab dilatometry files and export the results to excel.",
+    )
+    parser.add_argument(
+        "-f",
+        "--file",
+        nargs=3,
+        action="append",
+        default=[],
+        metavar=("FILE", "LABEL", "THICKNESS"),
+        help="file to process, its label and electrode reference thickness (um)",
+    )
+    parser.add_argument("-m", "--manifest", action="append", default=[])
+    parser.add_argument(
+        "-d",
+        "--directory",
+        action="append",
+        default=[],
+        help="process every .mpt/.txt file in a folder, labelled by file name",
+    )
+    parser.add_argument(
+        "-t",
+        "--thickness",
+        type=float,
+        help="reference thickness (um) for --directory and manifest rows without one",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=None,
+        help="number of worker processes (default: one per core)",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        required=True,
+        help="output file prefix, _Normalized_data.xlsx etc. are appended",
+    )
+    parser.add_argument(
+        "-b",
+        "--baseline",
+        choices=list(BASELINE_ENGINES),
+        default="cubic",
+        help="baseline fitting engine (default: cubic)",
+    )
+    parser.add_argument(
+        "-a",
+        "--average",
+        choices=AVERAGE_MODES,
+        default="index",
+        help="align cycles by sample index or on a normalized time grid (default: index)",
+    )
+    parser.add_argument(
+        "--grid-points",
+        type=int,
+        default=1000,
+        help="points per cycle of the normalized time grid (default: 1000)",
+    )
+    parser.add_argument(
+        "--align",
+        action="store_true",
+        help="align cycles on their potential traces before averaging, reports the lags",
+    )
+    parser.add_argument(
+        "--derivative-window",
+        type=int,
+        default=None,
+        help="smooth dD/dt with a Savitzky-Golay derivative filter of this window length",
+    )
+    parser.add_argument(
+        "--online",
+        action="store_true",
+        help="average cycles one at a time, memory doesn't grow with the cycle count",
+    )
+    parser.add_argument(
+        "--float32",
+        action="store_true",
+        help="store data tables in single precision to halve their memory",
+    )
+    parser.add_argument(
+        "--memory",
+        action="store_true",
+        help="report the memory held by each processed file",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="process files in bounded memory, only the averaged data is exported",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="always reparse files instead of using the parsed-data cache",
+    )
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    specs = [
+        (label, file_str, float(thickness)) for file_str, label, thickness in args.file
+    ]
+    for manifest in args.manifest:
+        specs.extend(read_manifest(manifest, args.thickness))
+    for directory in args.directory:
+        if args.thickness is None:
+            parser.error("--directory requires --thickness")
+        specs.extend(read_directory(directory, args.thickness))
+
+    if not specs:
+        parser.error("no files to process")
+
+    # Results are keyed by label, e.g. two folders with the same file name would
+    # overwrite each other
+    duplicates = duplicate_labels(specs)
+    if duplicates:
+        parser.error(
+            f"duplicate file labels: {', '.join(duplicates)}, "
+            "give the files unique labels (e.g. with a manifest)"
+        )
+
+    def report(label, done, total):
+        print(f"Processed {label} ({done}/{total})", file=sys.stderr)
+
+    processed_data = process_files(
+        specs,
+        workers=args.workers,
+        on_result=report,
+        cache=None if args.no_cache else default_cache,
+        stream=args.stream,
+        baseline_method=args.baseline,
+        average_mode=args.average,
+        grid_points=args.grid_points,
+        online_average=args.online,
+        align_cycles=args.align,
+        derivative_window=args.derivative_window,
+        dtype="float32" if args.float32 else "float64",
+    )
+
+    if args.align:
+        for label, data in processed_data.items():
+            lags = data.cycle_lags
+            print(
+                f"{label}: {(lags != 0).sum()} of {len(lags)} cycles shifted, "
+                f"lags {lags.min()} to {lags.max()}",
+                file=sys.stderr,
+            )
+
+    if args.memory:
+        for label, data in processed_data.items():
+            usage = ", ".join(
+                f"{name} {size / 1024**2:.1f} MB"
+                for name, size in data.memory_usage().items()
+            )
+            print(f"{label}: {usage}", file=sys.stderr)
+
+    output = args.output
+    if output.endswith(".xlsx"):
+        output = output[: -len(".xlsx")]
+
+    export_data(
+        norm_file=f"{output}_Normalized_data",
+        baseline_file=f"{output}_Data_minus_baseline",
+        average_file=f"{output}_Averaged_data",
+        processed_data=processed_data,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+
+
+def code_dtype(n):
+    # Smallest integer type holding 0..n, per-row codes/positions are the largest
+    # arrays of the index
+    return np.int16 if n < 2**15 else np.int32 if n < 2**31 else np.int64
+
+
+class CycleIndex:
+    # Start/stop row offsets for each cycle of a "cycle number" column. Rows belonging
+    # to the same cycle are gathered with a stable sort, so unsorted or repeated cycle
+    # numbers still map to a single block of rows per cycle in their original order
+    def __init__(self, cycle_numbers):
+        values = np.asarray(cycle_numbers)
+
+        if len(values) == 0 or np.all(values[1:] >= values[:-1]):
+            # Already sorted (the usual EC-Lab layout), boundaries are where the value changes
+            self.order = None
+            boundaries = np.flatnonzero(values[1:] != values[:-1]) + 1
+            self.starts = (
+                np.concatenate(([0], boundaries)) if len(values) else boundaries
+            )
+            self.cycles = values[self.starts]
+            self.lengths = np.diff(np.append(self.starts, len(values)))
+            self.codes = np.repeat(
+                np.arange(len(self.cycles), dtype=code_dtype(len(self.cycles))),
+                self.lengths,
+            )
+        else:
+            self.cycles, self.codes = np.unique(values, return_inverse=True)
+            self.codes = self.codes.ravel().astype(code_dtype(len(self.cycles)))
+            self.order = np.argsort(self.codes, kind="stable")
+            self.lengths = np.bincount(self.codes, minlength=len(self.cycles))
+            self.starts = np.cumsum(self.lengths) - self.lengths
+
+        self.stops = self.starts + self.lengths
+        self._positions = None
+
+    def __len__(self):
+        return len(self.cycles)
+
+    @property
+    def nbytes(self):
+        arrays = [self.order, self.starts, self.stops, self.lengths, self.cycles]
+        arrays += [self.codes, self._positions]
+        return sum(arr.nbytes for arr in arrays if arr is not None)
+
+    @property
+    def is_sorted(self):
+        return self.order is None
+
+    @property
+    def first_rows(self):
+        # Row position of the first sample of every cycle
+        if self.order is None:
+            return self.starts
+        return self.order[self.starts]
+
+    def rows(self, pos):
+        # Rows of the cycle at index position `pos`, as a slice when the column is sorted
+        # so that indexing returns a view instead of a copy
+        start, stop = self.starts[pos], self.stops[pos]
+        if self.order is None:
+            return slice(start, stop)
+        return self.order[start:stop]
+
+    def span(self, first=0, last=None):
+        # Rows covering the cycles at positions first..last-1 (sorted columns only)
+        if self.order is not None:
+            raise ValueError("Row spans require a sorted cycle number column")
+        last = len(self.cycles) if last is None else last
+        if last <= first:
+            return slice(0, 0)
+        return slice(self.starts[first], self.stops[last - 1])
+
+    def broadcast(self, per_cycle):
+        # Expand one value per cycle back onto every row of that cycle
+        return np.asarray(per_cycle)[self.codes]
+
+    def argmax(self, values):
+        # Row of the first maximum of every cycle, reduced over all cycles at once.
+        # NaNs are ignored, a cycle of only NaNs gives its first row
+        values = np.asarray(values)
+        if self.order is not None:
+            values = values[self.order]
+
+        peaks = np.fmax.reduceat(values, self.starts)
+        hits = np.where(
+            values == np.repeat(peaks, self.lengths),
+            np.arange(len(values)),
+            len(values),
+        )
+        rows = np.minimum.reduceat(hits, self.starts)
+        rows = np.where(rows < len(values), rows, self.starts)
+
+        if self.order is None:
+            return rows
+        return self.order[rows]
+
+    def argmin(self, values):
+        # Row of the first minimum of every cycle
+        return self.argmax(-np.asarray(values))
+
+    @property
+    def positions(self):
+        # Offset of every row within its own cycle
+        if self._positions is None:
+            sorted_positions = (
+                np.arange(len(self.codes)) - np.repeat(self.starts, self.lengths)
+            ).astype(code_dtype(self.lengths.max(initial=0)))
+            if self.order is None:
+                self._positions = sorted_positions
+            else:
+                self._positions = np.empty_like(sorted_positions)
+                self._positions[self.order] = sorted_positions
+        return self._positions
+
+
+def iter_cycles(chunks):
+    """
+    Regroup a stream of row chunks into complete cycles, yielding
+    (cycle number, rows) once all rows of a cycle have been read.
+    """
+    pending = []
+    current = None
+
+    for chunk in chunks:
+        index = CycleIndex(chunk["cycle number"])
+        if not index.is_sorted or (pending and index.cycles[0] < current):
+            raise ValueError(
+                "Streaming requires cycle numbers in ascending order, "
+                "load the file in memory instead"
+            )
+
+        for pos in range(len(index)):
+            cycle = index.cycles[pos]
+            if pending and cycle != current:
+                yield current, pd.concat(pending, ignore_index=True)
+                pending = []
+
+            pending.append(chunk.iloc[index.rows(pos)])
+            current = cycle
+
+    if pending:
+        yield current, pd.concat(pending, ignore_index=True)
@@ -0,0 +1,143 @@
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = os.environ.get(
+    "DILATOMETRY_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".dilatometry_analyst", "cache"),
+)
+MAX_CACHE_BYTES = 2 * 1024**3
+
+# Bump when the on-disk layout changes so stale entries are never read back
+CACHE_VERSION = 1
+
+
+class DataCache:
+    # Parsed EC-Lab tables stored as uncompressed .npz files, keyed on the source
+    # file's path, size and modification time (optionally a hash of its contents).
+    # Entries are touched on every hit and the least recently used ones are removed
+    # once the directory grows past max_bytes
+    def __init__(
+        self, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES, hash_contents=False
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hash_contents = hash_contents
+
+    def key(self, file_str, columns):
+        path = os.path.normcase(os.path.abspath(file_str))
+        stat = os.stat(path)
+
+        parts = [
+            str(CACHE_VERSION),
+            path,
+            str(stat.st_size),
+            str(stat.st_mtime_ns),
+            "\t".join(columns),
+        ]
+        if self.hash_contents:
+            parts.append(self.file_digest(path))
+
+        return hashlib.sha1("\0".join(parts).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def file_digest(path, block_size=1024**2):
+        digest = hashlib.sha1()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def load(self, file_str, columns):
+        entry = self.entry_path(self.key(file_str, columns))
+
+        try:
+            with np.load(entry, allow_pickle=False) as npz:
+                names = npz["names"]
+                frame = pd.DataFrame(
+                    {name: npz[f"col{i}"] for i, name in enumerate(names)}
+                )
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError):
+            # Truncated or otherwise unreadable entry, drop it and reparse the source
+            self.remove(entry)
+            return None
+
+        # Mark as recently used for eviction
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+
+        return frame
+
+    def store(self, file_str, columns, frame):
+        # The cache is an optimization only, never fail a load because of it
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            entry = self.entry_path(self.key(file_str, columns))
+
+            # Write to a temporary file first so readers never see a partial entry
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        except OSError:
+            return
+
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(
+                    f,
+                    names=np.array(frame.columns, dtype=str),
+                    **{
+                        f"col{i}": frame[name].to_numpy()
+                        for i, name in enumerate(frame.columns)
+                    },
+                )
+            os.replace(tmp, entry)
+        except OSError:
+            # E.g. disk full, don't leave the partial temporary file behind
+            self.remove(tmp)
+            return
+
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".npz"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self.remove(os.path.join(self.cache_dir, name))
+            total -= size
+
+    def clear(self):
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                # Temporary files are left over from interrupted writes
+                if name.endswith((".npz", ".tmp")):
+                    self.remove(os.path.join(self.cache_dir, name))
+
+    @staticmethod
+    def remove(entry):
+        try:
+            os.remove(entry)
+        except OSError:
+            pass
+
+
+default_cache = DataCache()
@@ -1,6 +1,9 @@
+from outliers import PointMask
+from plot_data import plot_cache
+from smoothing import savgol
 from ui_elements import BaseWindow, FigureWindow
 
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QThreadPool, QRunnable, QObject, QTimer, pyqtSignal
 from PyQt5.QtWidgets import (
     QSizePolicy,
     QHBoxLayout,
@@ -9,6 +12,33 @@ from PyQt5.QtWidgets import (
     QWidget,
 )
 
+# Time after the last slider move before a curve is smoothed, in ms
+SMOOTHING_DEBOUNCE_MS = 60
+
+
+class SmoothingSignals(QObject):
+    result = pyqtSignal(object, int, object, int, object)
+
+
+class SmoothingWorker(QRunnable):
+    def __init__(self, figure, generation, y, window, order):
+        super(SmoothingWorker, self).__init__()
+        self.signals = SmoothingSignals()
+        self.figure = figure
+        self.generation = generation
+        self.y = y
+        self.window = window
+        self.order = order
+
+    def run(self):
+        try:
+            smoothed = savgol(self.y, self.window, self.order)
+        except ValueError:
+            return
+        self.signals.result.emit(
+            self.figure, self.generation, self.y, self.window, smoothed
+        )
+
 
 class DerivativeWindow(BaseWindow):
     def __init__(self, derivative_data, parent=None):
@@ -16,6 +46,13 @@ class DerivativeWindow(BaseWindow):
 
         self.data = derivative_data
 
+        # Slider moves are coalesced per figure and the filter runs on a worker thread.
+        # Every request bumps the figure's generation, results of superseded requests
+        # are dropped so only the latest smoothing is drawn
+        self.threadpool = QThreadPool()
+        self.generations = {}
+        self.smoothing_timers = {}
+
         self.setWindowTitle("Dilatometry Analyst: Displacement Derivatives")
         self.resize(1400, 877)
 
@@ -24,26 +61,35 @@ class DerivativeWindow(BaseWindow):
         scrolling_widget.setLayout(scroll_layout)
 
         for key in self.data:
+            plot_data = plot_cache.get(self.data[key])
+
+            # Both plots of a file edit the same dD/dt points, so they share one mask
+            mask = PointMask(
+                len(plot_data["dD/dt"]), keep=self.data[key].derivative_mask
+            )
+
             dDdt_vs_V = FigureWindow(
                 width=3,
                 height=3,
-                x=self.data[key].averaged_data["Average Potential (V)"],
-                y=self.data[key].averaged_data["dD/dt"],
+                x=plot_data["Average Potential (V)"],
+                y=plot_data["dD/dt"],
                 xlabel="Potential (V)",
                 ylabel="dD/dt ($\mu$m/s)",
                 curve_label=key,
                 smoothing=True,
+                mask=mask,
             )
 
             dDdt_vs_i = FigureWindow(
                 width=3,
                 height=3,
-                x=self.data[key].averaged_data["Average Current (mA)"],
-                y=self.data[key].averaged_data["dD/dt"] * -1,
+                x=plot_data["Average Current (mA)"],
+                y=plot_data["dD/dt"] * -1,
                 xlabel="Current (mA)",
                 ylabel="-dD/dt ($\mu$m/s)",
                 curve_label=key,
                 smoothing=True,
+                mask=mask,
             )
 
             container = QWidget()
@@ -55,6 +101,16 @@ class DerivativeWindow(BaseWindow):
             container_layout.addWidget(dDdt_vs_i)
             scroll_layout.addWidget(container)
 
+            self.debounce_smoothing(dDdt_vs_V)
+            self.debounce_smoothing(dDdt_vs_i)
+
+            for figure, other in [(dDdt_vs_V, dDdt_vs_i), (dDdt_vs_i, dDdt_vs_V)]:
+                figure.edited.connect(
+                    lambda key=key, mask=mask, other=other: self.apply_edit(
+                        key, mask, other
+                    )
+                )
+
         scroll = QScrollArea()
         scroll.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
         scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOn)
@@ -62,3 +118,47 @@ class DerivativeWindow(BaseWindow):
         scroll.setWidget(scrolling_widget)
 
         self.setCentralWidget(scroll)
+
+    def apply_edit(self, key, mask, other):
+        # Removed points are exported as NaN in the dD/dt column
+        self.data[key].set_derivative_mask(mask.keep)
+        other.refresh_curve()
+
+    def debounce_smoothing(self, figure):
+        figure.smoothing_slider.valueChanged.disconnect(figure.smooth_curve)
+
+        timer = QTimer(self)
+        timer.setSingleShot(True)
+        timer.setInterval(SMOOTHING_DEBOUNCE_MS)
+        timer.timeout.connect(lambda: self.start_smoothing(figure))
+        figure.smoothing_slider.valueChanged.connect(lambda _: timer.start())
+
+        self.generations[figure] = 0
+        self.smoothing_timers[figure] = timer
+
+    def start_smoothing(self, figure):
+        self.generations[figure] += 1
+        window = figure.smoothing_slider.value()
+
+        smoothed = figure.smoothed.get(window)
+        if smoothed is not None:
+            figure.show_smoothed(smoothed)
+            return
+
+        worker = SmoothingWorker(
+            figure,
+            self.generations[figure],
+            figure.smoothed.y,
+            window,
+            figure.smoothed.order,
+        )
+        worker.signals.result.connect(self.finish_smoothing)
+        self.threadpool.start(worker)
+
+    def finish_smoothing(self, figure, generation, y, window, smoothed):
+        # Drop results of superseded requests or of a curve that has since been edited
+        if generation != self.generations[figure] or y is not figure.smoothed.y:
+            return
+
+        figure.smoothed.store(window, smoothed)
+        figure.show_smoothed(smoothed)
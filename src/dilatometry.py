@@ -1,181 +1,627 @@
 import pandas as pd
 import numpy as np
 
-from scipy.interpolate import interp1d
-
-pd.options.mode.chained_assignment = None
+from averaging import (
+    CycleAccumulator,
+    averaged_frame,
+    cycle_lags,
+    cycle_matrix,
+    nan_mean_std,
+    resample_cycles,
+    shift_cycles,
+)
+from baseline import extremum_row, extremum_rows, get_baseline_engine
+from cycle_index import CycleIndex, iter_cycles
+from data_cache import default_cache
+from ec_lab import REQUIRED_COLUMNS, iter_ec_lab, load_ec_lab
+from smoothing import savgol_derivative
+
+# Rows parsed per chunk in streaming mode
+STREAM_CHUNKSIZE = 200_000
+
+# Float columns of the buffer shared by data and data_minus_baseline, in buffer order.
+# Cycle numbers are kept separately as a compact integer column
+RAW_COLUMNS = [name for name in REQUIRED_COLUMNS if name != "cycle number"]
+DERIVED_COLUMNS = [
+    "Normalized displacement",
+    "Percent change displacement (total)",
+    "Percent change displacement (per cycle)",
+]
+BASELINE_COLUMNS = ["Displacement minus baseline", "Percent change minus baseline"]
+FLOAT_COLUMNS = RAW_COLUMNS + DERIVED_COLUMNS + BASELINE_COLUMNS
+
+# How cycles are aligned for averaging: "index" pairs up samples by their position in
+# the cycle, "time" resamples every cycle onto a grid of normalized cycle time so cycles
+# of slightly different lengths are averaged in phase
+AVERAGE_MODES = ["index", "time"]
+
+
+def compact_cycle_numbers(values):
+    # EC-Lab writes cycle numbers as floats, store them in the smallest integer type
+    # that holds them (int16 for anything up to 32767 cycles)
+    values = np.asarray(values)
+    if len(values) == 0 or not np.array_equal(values, np.trunc(values)):
+        return values
+
+    for dtype in (np.int16, np.int32, np.int64):
+        info = np.iinfo(dtype)
+        if info.min <= values.min() and values.max() <= info.max:
+            return values.astype(dtype)
+    return values
 
 
 class Dilatometry:
-    def __init__(self, ref_thickness):
+    # Processing stages in execution order: the method that runs each one, the parameters
+    # it reads and the stages whose outputs it consumes. update() only reruns the stages
+    # depending on the changed parameters, directly or through their inputs, everything
+    # else keeps its cached output. The reference thickness only scales the % columns, so
+    # changing it only reruns the cheap "percent" stage
+    stages = {
+        "normalize": {
+            "method": "normalize_data",
+            "params": (),
+            "inputs": (),
+        },
+        "baseline": {
+            "method": "subtract_baseline",
+            "params": ("baseline_method",),
+            "inputs": ("normalize",),
+        },
+        "average": {
+            "method": "average_data",
+            "params": (
+                "skip_first",
+                "skip_last",
+                "average_mode",
+                "grid_points",
+                "online_average",
+                "align_cycles",
+            ),
+            "inputs": ("baseline",),
+        },
+        "derivatives": {
+            "method": "calc_derivatives",
+            "params": ("derivative_window",),
+            "inputs": ("average",),
+        },
+        "percent": {
+            "method": "update_percent",
+            "params": ("ref_thickness",),
+            "inputs": (),
+        },
+    }
+
+    # Stages that need the full data table, which isn't kept in streaming mode
+    data_stages = ("normalize", "baseline", "average")
+
+    def __init__(
+        self,
+        ref_thickness,
+        baseline_method="cubic",
+        skip_first=1,
+        skip_last=1,
+        average_mode="index",
+        grid_points=1000,
+        online_average=False,
+        align_cycles=False,
+        derivative_window=None,
+        dtype="float64",
+    ):
         self.ref_thickness = ref_thickness
+        self.baseline_method = baseline_method
+        # Cycles excluded from the start/end of the average, the first cycle is
+        # never part of the baseline subtracted data so at least 1 has to be skipped
+        self.skip_first = skip_first
+        self.skip_last = skip_last
+        # Points per cycle of the normalized time grid in "time" averaging mode,
+        # more points keep more detail at the cost of memory
+        self.average_mode = average_mode
+        self.grid_points = grid_points
+        # Push cycles one at a time into a running accumulator instead of reducing a
+        # (cycles x samples) buffer, memory then doesn't grow with the number of cycles
+        self.online_average = online_average
+        # Shift every averaged cycle to the lag that best matches its potential trace to
+        # the first averaged cycle before averaging, the lags applied (in samples, or grid
+        # points in "time" mode) are kept in cycle_lags
+        self.align_cycles = align_cycles
+        self.cycle_lags = None
+        # Window length of the Savitzky-Golay derivative filter used for dD/dt,
+        # None for the unsmoothed point-to-point gradient
+        self.derivative_window = derivative_window
+        # Unmasked dD/dt and the keep-mask of points removed as outliers in the
+        # derivative plots, removed points are NaN in averaged_data["dD/dt"]
+        self.derivative = None
+        self.derivative_mask = None
+        # Storage type of the data tables, float32 halves their memory at the
+        # cost of precision (~7 significant digits)
+        self.dtype = np.dtype(dtype)
+        self.buffer = None
+        self.baseline_span = None
+        self.data = None
         self.data_minus_baseline = None
         self.averaged_data = None
+        self.completed = set()
+        # Bumped whenever processing results change, e.g. for caches of plot data
+        self.revision = 0
+
+    def __getstate__(self):
+        # data/data_minus_baseline are views of the buffer, pickle the buffer once
+        # (e.g. when returned from a worker process) and rebuild the views on load
+        state = self.__dict__.copy()
+        if self.buffer is not None:
+            state["cycle_numbers"] = self.data["cycle number"].to_numpy()
+            state["data"] = None
+            state["data_minus_baseline"] = None
+        return state
+
+    def __setstate__(self, state):
+        cycle_numbers = state.pop("cycle_numbers", None)
+        self.__dict__.update(state)
+        if cycle_numbers is not None:
+            self.build_tables(cycle_numbers)
+
+    def pending_stages(self, stale=()):
+        # Stages run(stale) would run, in execution order: the ones that haven't run
+        # yet, are listed in `stale` or consume the output of one of those
+        pending = []
+        for name, stage in self.stages.items():
+            if (
+                name not in self.completed
+                or name in stale
+                or set(pending).intersection(stage["inputs"])
+            ):
+                pending.append(name)
+        return pending
+
+    def check_stages(self, names):
+        # Fail before anything is recomputed if a stage can't run on this object
+        for name in names:
+            if self.data is None and name in self.data_stages:
+                raise ValueError(
+                    f"The {name} stage needs the full data table, "
+                    "reload the file without streaming to change this parameter"
+                )
 
-    def load_data(self, file_str):
-        with open(file_str, "r") as f:
-            self.data = pd.read_table(f)
+    def run(self, stale=()):
+        """
+        Run every stage that hasn't run yet, is listed in `stale` or consumes
+        the output of a stage that was rerun. Returns the names of the stages run.
+        """
+        pending = self.pending_stages(stale)
+        self.check_stages(pending)
+
+        for name in pending:
+            getattr(self, self.stages[name]["method"])()
+            self.completed.add(name)
+
+        if pending:
+            self.revision += 1
+        return set(pending)
+
+    def update(self, **params):
+        """
+        Change processing parameters in place and recompute only the affected stages.
+        If that fails the previous parameters and results are kept.
+        """
+        changed = {}
+        for name, value in params.items():
+            if not any(name in stage["params"] for stage in self.stages.values()):
+                raise ValueError(f"Unknown processing parameter: {name}")
+            if getattr(self, name) != value:
+                changed[name] = value
+
+        stale = {
+            name
+            for name, stage in self.stages.items()
+            if set(changed).intersection(stage["params"])
+        }
+        self.check_stages(self.pending_stages(stale))
+
+        previous = {name: getattr(self, name) for name in changed}
+        derivative_mask = self.derivative_mask
+        for name, value in changed.items():
+            setattr(self, name, value)
+
+        try:
+            return self.run(stale)
+        except Exception:
+            # Stages that already ran with the new values are recomputed with the
+            # old ones, which ran fine before
+            for name, value in previous.items():
+                setattr(self, name, value)
+            self.run(stale)
+
+            # Rerunning the average drops the outlier mask, the restored average
+            # is the one it was made for
+            if derivative_mask is not None:
+                self.set_derivative_mask(derivative_mask)
+            raise
+
+    def percent(self, values):
+        # Displacement change in % relative to reference thickness
+        return values / abs(self.ref_thickness) * 100
+
+    def load_data(self, file_str, cache=default_cache):
+        # Reuse the parsed table from the on-disk cache when the file hasn't changed
+        frame = cache.load(file_str, REQUIRED_COLUMNS) if cache else None
+        if frame is None:
+            frame = load_ec_lab(file_str)
+            if cache:
+                cache.store(file_str, REQUIRED_COLUMNS, frame)
+
+        # Unsorted/repeated cycle numbers are gathered so each cycle is one contiguous block
+        order = CycleIndex(frame["cycle number"]).order
+        if order is not None:
+            frame = frame.take(order)
+
+        self.set_data(frame)
+
+    def set_data(self, columns):
+        """
+        Store parsed columns (a DataFrame or dict of arrays) in one float buffer that
+        also holds every derived column, data and data_minus_baseline are views of it.
+        """
+        n_rows = len(columns["time/s"])
+        # One buffer row per column, so every column is contiguous
+        self.buffer = np.full((len(FLOAT_COLUMNS), n_rows), np.nan, dtype=self.dtype)
+        for pos, name in enumerate(RAW_COLUMNS):
+            self.buffer[pos] = columns[name]
+
+        self.baseline_span = None
+        self.build_tables(compact_cycle_numbers(columns["cycle number"]))
+
+        # Build the cycle boundary index once, every later stage slices cycles out of it
+        self.cycle_index = CycleIndex(self.data["cycle number"].to_numpy())
+        self.cycle_num = self.cycle_index.cycles
+        self.zero_val = self.column("Analog IN 1/V")[0] if n_rows else None
+
+    def build_tables(self, cycle_numbers):
+        self.data = self.table_view(
+            slice(0, self.buffer.shape[1]), RAW_COLUMNS + DERIVED_COLUMNS, cycle_numbers
+        )
+        self.data_minus_baseline = None
+        if self.baseline_span is not None:
+            self.data_minus_baseline = self.table_view(
+                self.baseline_span, FLOAT_COLUMNS, cycle_numbers[self.baseline_span]
+            )
 
-        self.cycle_num = self.data["cycle number"].unique()
-        self.zero_val = self.data["Analog IN 1/V"].iloc[0]
+    def table_view(self, rows, names, cycle_numbers):
+        # DataFrame over buffer rows without copying, only the small cycle number
+        # column is copied in at its position in the file layout
+        table = pd.DataFrame(
+            self.buffer[: len(names), rows].T,
+            columns=names,
+            index=pd.RangeIndex(rows.start, rows.stop),
+            copy=False,
+        )
+        table.insert(
+            REQUIRED_COLUMNS.index("cycle number"), "cycle number", cycle_numbers
+        )
+        return table
+
+    def column(self, name):
+        # Writable view of a buffer column, writes show up in data/data_minus_baseline
+        return self.buffer[FLOAT_COLUMNS.index(name)]
+
+    def memory_usage(self):
+        """
+        Bytes held by each table and the cycle index. Memory shared with a table
+        listed earlier (e.g. the buffer behind data_minus_baseline) counts only once.
+        """
+        seen = set()
+        usage = {}
+        for name in ["data", "data_minus_baseline", "averaged_data"]:
+            table = getattr(self, name)
+            usage[name] = 0
+            if table is None:
+                continue
+            for col in table.columns:
+                root = table[col].to_numpy()
+                while isinstance(root.base, np.ndarray):
+                    root = root.base
+                if id(root) not in seen:
+                    seen.add(id(root))
+                    usage[name] += root.nbytes
+
+        index = getattr(self, "cycle_index", None)
+        usage["cycle_index"] = index.nbytes if index is not None else 0
+        usage["total"] = sum(usage.values())
+        return usage
 
     def normalize_data(self):
         # Normalize data to first value in displacement column
-        self.data["Normalized displacement"] = (
-            self.data["Analog IN 1/V"] - self.zero_val
-        )
+        raw_disp = self.column("Analog IN 1/V")
+        norm_disp = self.column("Normalized displacement")
+        np.subtract(raw_disp, self.zero_val, out=norm_disp)
 
         # Displacement change in % relative to reference thickness - Raw displacment
         # values are already the delta in thickness, don't have to subtract ref thickness
-        self.data["Percent change displacement (total)"] = (
-            (self.data["Normalized displacement"]) / abs(self.ref_thickness) * 100
-        )
+        self.column("Percent change displacement (total)")[:] = self.percent(norm_disp)
 
-        # % displacement change on cycle-to-cycle basis, normalizing to first disp val of each cycle
-        self.data["Percent change displacement (per cycle)"] = 0
+        # % displacement change on cycle-to-cycle basis, normalizing to first disp val of each cycle.
+        # The first value of each cycle is broadcast back onto its rows in a single pass
+        cycle_zero = self.cycle_index.broadcast(raw_disp[self.cycle_index.first_rows])
 
-        for cycle in self.cycle_num:
-            cycle_zero = self.data["Analog IN 1/V"][
-                self.data["cycle number"] == cycle
-            ].iloc[0]
-            cycle_norm = (
-                self.data["Analog IN 1/V"][self.data["cycle number"] == cycle]
-                - cycle_zero
-            )
-            self.data["Percent change displacement (per cycle)"][
-                self.data["cycle number"] == cycle
-            ] = (cycle_norm / abs(self.ref_thickness) * 100)
+        self.column("Percent change displacement (per cycle)")[:] = self.percent(
+            raw_disp - cycle_zero
+        )
 
     def subtract_baseline(self):
-        # Subtracting baseline (calculated with cubic spline fitting of local maxima) from displacement data, excluding first cycle
-        self.data_minus_baseline = self.data[self.data["cycle number"] > 1].copy()
+        # Subtracting baseline (fitted to the local maxima, or minima, of each cycle by the
+        # selected baseline engine) from displacement data, excluding first cycle
+        index = self.cycle_index
+        disp = self.column("Normalized displacement")
+        time = self.column("time/s")
 
-        maxima = []
-        times = []
-
-        for cycle in self.cycle_num[1:]:
-            ref = self.data_minus_baseline[
-                self.data_minus_baseline["cycle number"] == cycle
-            ]
-
-            idx = ref.index[
-                ref["Normalized displacement"] == max(ref["Normalized displacement"])
-            ]
+        # Extremum of every cycle found in one grouped pass
+        points = get_baseline_engine(self.baseline_method)["points"]
+        peak_rows = extremum_rows(index, disp, points)[1:]
 
-            maxima.append(ref.loc[idx, "Normalized displacement"].values[0])
-            times.append(ref.loc[idx, "time/s"].values[0])
+        fit = self.fit_baseline(time[peak_rows], disp[peak_rows])
 
-        fit = interp1d(
-            np.array(times),
-            np.array(maxima),
-            kind="cubic",
-            fill_value="extrapolate",
-        )
-
-        x = self.data_minus_baseline["time/s"]
-        y = self.data_minus_baseline["Normalized displacement"]
-        cubic = fit(x)
+        rows = index.span(1)
+        y_minus_fit = disp[rows] - fit(time[rows])
 
         # Renormalize to first value due to fit subtraction offsetting the data
-        offset_corrected_disp = (y - cubic) - (y - cubic).iloc[0]
-
-        self.data_minus_baseline["Displacement minus baseline"] = offset_corrected_disp
+        offset_corrected_disp = self.column("Displacement minus baseline")[rows]
+        np.subtract(y_minus_fit, y_minus_fit[0], out=offset_corrected_disp)
 
         # Getting % change
-        self.data_minus_baseline["Percent change minus baseline"] = (
-            offset_corrected_disp / abs(self.ref_thickness) * 100
+        self.column("Percent change minus baseline")[rows] = self.percent(
+            offset_corrected_disp
+        )
+
+        self.baseline_span = rows
+        self.data_minus_baseline = self.table_view(
+            rows, FLOAT_COLUMNS, self.data["cycle number"].to_numpy()[rows]
         )
 
-    def tolerant_mean(self, arrs):
-        # Calculates means/std devs for arrays that are different lengths
-        lens = [len(i) for i in arrs]
-        arr = np.ma.empty((np.max(lens), len(arrs)))
-        arr.mask = True
-        for idx, l in enumerate(arrs):
-            arr[: len(l), idx] = l
-        return arr.mean(axis=1), arr.std(axis=1)
+    def fit_baseline(self, times, values):
+        engine = get_baseline_engine(self.baseline_method)
+        return engine["fit"](np.asarray(times), np.asarray(values))
 
     def average_data(self):
-        # Averaging all data and getting std dev, excluding first and last cycle
+        # Averaging all data and getting std dev, excluding first and last cycle (by default)
         # to avoid weirdness that comes when switching scan rates/cycling procedure
-        ref_data = self.data_minus_baseline.copy()
-
-        time = []
-        potential = []
-        current = []
-        charge = []
-        disp = []
-        percent_disp = []
-
-        for cycle in self.cycle_num[1:-1]:
-            # Rormalize time values for each cycle for averaging
-            time.append(
-                np.asarray(
-                    ref_data["time/s"][ref_data["cycle number"] == cycle]
-                    - ref_data["time/s"][ref_data["cycle number"] == cycle].iloc[0]
-                )
+        if self.skip_first < 1 or self.skip_last < 0:
+            raise ValueError(
+                "At least the first cycle has to be excluded from averaging"
             )
+        self.check_average_mode()
+        self.derivative_mask = None
+
+        index = self.cycle_index
+        averaged = range(self.skip_first, len(index) - self.skip_last)
+        if self.online_average:
+            accumulator = CycleAccumulator(n_channels=6)
+            reference = None
+            lags = []
+            for pos in averaged:
+                rows = index.rows(pos)
+                channels = self.cycle_channels(
+                    *[
+                        self.column(name)[rows]
+                        for name in [
+                            "time/s",
+                            "Ewe/V",
+                            "<I>/mA",
+                            "(Q-Qo)/C",
+                            "Displacement minus baseline",
+                        ]
+                    ]
+                )
+                if self.align_cycles:
+                    if reference is None:
+                        reference = channels[:, 1]
+                    channels, lag = self.align_channels(channels, reference)
+                    lags.append(lag)
+                accumulator.push(channels)
+
+            self.set_cycle_lags(index.cycles[averaged], lags)
+            self.averaged_data = accumulator.frame()
+            return
+
+        span = index.span(self.skip_first, len(index) - self.skip_last)
+
+        # Normalize time values for each cycle for averaging
+        time = self.column("time/s")[span]
+        time = time - time[index.starts[index.codes[span]] - span.start]
+
+        channels = np.column_stack(
+            [time]
+            + [
+                self.column(name)[span]
+                for name in [
+                    "Ewe/V",
+                    "<I>/mA",
+                    "(Q-Qo)/C",
+                    "Displacement minus baseline",
+                    "Percent change minus baseline",
+                ]
+            ]
+        )
 
-            potential.append(
-                np.asarray(ref_data["Ewe/V"][ref_data["cycle number"] == cycle])
+        codes = index.codes[span] - self.skip_first
+        if self.average_mode == "time":
+            # Phase of every row within its cycle, from 0 at the first to 1 at the last sample
+            duration = time[index.stops[index.codes[span]] - 1 - span.start]
+            phase = time / np.where(duration > 0, duration, 1)
+            buffer = resample_cycles(channels, codes, phase, self.grid_points)
+        else:
+            # All cycles and channels are reduced at once from a single padded buffer
+            buffer = cycle_matrix(channels, codes, index.positions[span])
+
+        lags = []
+        if self.align_cycles:
+            # Potential traces of all cycles are correlated against the first one at once
+            lags = cycle_lags(buffer[:, :, 1], buffer[0, :, 1])
+            buffer = shift_cycles(buffer, lags)
+        self.set_cycle_lags(index.cycles[averaged], lags)
+
+        avg, dev = nan_mean_std(buffer)
+
+        self.averaged_data = averaged_frame(avg, dev)
+
+    def cycle_channels(self, time, potential, current, charge, disp):
+        # Channels averaged for a single cycle in averaged_frame order, resampled
+        # onto the normalized time grid in "time" mode
+        time = time - time[0]
+        channels = np.column_stack(
+            [time, potential, current, charge, disp, self.percent(disp)]
+        )
+        if self.average_mode == "time":
+            phase = time / (time[-1] if time[-1] > 0 else 1)
+            codes = np.zeros(len(time), dtype=np.int64)
+            channels = resample_cycles(channels, codes, phase, self.grid_points)[0]
+        return channels
+
+    def align_channels(self, channels, reference):
+        # Shift one cycle's channels to its lag against the reference potential trace
+        lag = cycle_lags(channels[:, 1], reference)[0]
+        return shift_cycles(channels[None], [lag])[0], lag
+
+    def set_cycle_lags(self, cycles, lags):
+        self.cycle_lags = None
+        if self.align_cycles:
+            self.cycle_lags = pd.Series(
+                np.asarray(lags, dtype=int),
+                index=pd.Index(cycles, name="cycle number"),
+                name="Lag",
             )
 
-            current.append(
-                np.asarray(ref_data["<I>/mA"][ref_data["cycle number"] == cycle])
-            )
+    def check_average_mode(self):
+        if self.average_mode not in AVERAGE_MODES:
+            raise ValueError(f"Unknown averaging mode: {self.average_mode}")
+        if self.average_mode == "time" and self.grid_points < 2:
+            raise ValueError("The averaging grid needs at least 2 points")
 
-            charge.append(
-                np.asarray(ref_data["(Q-Qo)/C"][ref_data["cycle number"] == cycle])
+    def calc_derivatives(self):
+        time = self.averaged_data["Average Time (s)"].to_numpy()
+        disp = self.averaged_data["Average Displacement (um)"].to_numpy()
+
+        if self.derivative_window:
+            self.derivative = savgol_derivative(disp, time, self.derivative_window)
+        else:
+            self.derivative = np.gradient(disp) / np.gradient(time)
+
+        if self.derivative_mask is not None and len(self.derivative_mask) != len(
+            self.derivative
+        ):
+            self.derivative_mask = None
+        self.set_derivative_mask(self.derivative_mask)
+
+    def set_derivative_mask(self, keep):
+        # keep: boolean array over the averaged points, None keeps every point
+        self.derivative_mask = None if keep is None else np.array(keep, dtype=bool)
+        dDdt = self.derivative.copy()
+        if self.derivative_mask is not None:
+            dDdt[~self.derivative_mask] = np.nan
+        self.averaged_data["dD/dt"] = dDdt
+
+    def update_percent(self):
+        # Recompute every % column from the um columns for the current reference thickness.
+        # data_minus_baseline shares the buffer, so its % columns are updated along with data
+        if self.buffer is not None and "normalize" in self.completed:
+            self.column("Percent change displacement (total)")[:] = self.percent(
+                self.column("Normalized displacement")
             )
-
-            disp.append(
-                np.asarray(
-                    ref_data["Displacement minus baseline"][
-                        ref_data["cycle number"] == cycle
-                    ]
-                )
+            raw_disp = self.column("Analog IN 1/V")
+            cycle_zero = self.cycle_index.broadcast(
+                raw_disp[self.cycle_index.first_rows]
+            )
+            self.column("Percent change displacement (per cycle)")[:] = self.percent(
+                raw_disp - cycle_zero
             )
 
-            percent_disp.append(
-                np.asarray(
-                    ref_data["Percent change minus baseline"][
-                        ref_data["cycle number"] == cycle
-                    ]
-                )
+        if self.baseline_span is not None:
+            rows = self.baseline_span
+            self.column("Percent change minus baseline")[rows] = self.percent(
+                self.column("Displacement minus baseline")[rows]
             )
 
-        avg_time, _ = self.tolerant_mean(time)
-        avg_potential, _ = self.tolerant_mean(potential)
-        avg_current, dev_current = self.tolerant_mean(current)
-        avg_charge, dev_charge = self.tolerant_mean(charge)
-        avg_disp, dev_disp = self.tolerant_mean(disp)
-        avg_percent_disp, dev_percent_disp = self.tolerant_mean(percent_disp)
-
-        # Renormalize displacement to first value
-        avg_disp = avg_disp - avg_disp[0]
-        avg_percent_disp = avg_percent_disp - avg_percent_disp[0]
-
-        self.averaged_data = pd.DataFrame(
-            {
-                "Average Time (s)": avg_time,
-                "Average Potential (V)": avg_potential,
-                "Average Current (mA)": avg_current,
-                "Current Stand Dev (mA)": dev_current,
-                "Average Charge (C)": avg_charge,
-                "Charge Stand Dev (C)": dev_charge,
-                "Average Displacement (um)": avg_disp,
-                "Displacement Stand Dev (um)": dev_disp,
-                "Average Displacement (%)": avg_percent_disp,
-                "Displacement Stand Dev (%)": dev_percent_disp,
-            }
-        )
+        if self.averaged_data is not None:
+            self.averaged_data["Average Displacement (%)"] = self.percent(
+                self.averaged_data["Average Displacement (um)"]
+            )
+            self.averaged_data["Displacement Stand Dev (%)"] = self.percent(
+                self.averaged_data["Displacement Stand Dev (um)"]
+            )
 
-        self.averaged_data["ox/red"] = [
-            0 if x < 0 else 1 for x in self.averaged_data["Average Current (mA)"]
-        ]
+    def stream_data(self, file_str, chunksize=STREAM_CHUNKSIZE):
+        # Bounded-memory replacement for load_data -> normalize_data -> subtract_baseline ->
+        # average_data, for files too large to hold in memory. The file is read in chunks
+        # and processed one completed cycle at a time. The baseline fit needs the maxima of
+        # every cycle, so a first pass collects them and a second pass subtracts the fit
+        # from each cycle and feeds the averaging accumulator. Only the averaged data is
+        # kept, data and data_minus_baseline are left as None
+        self.buffer = None
+        self.baseline_span = None
+        self.data = None
+        self.data_minus_baseline = None
+        self.zero_val = None
 
-    def calc_derivatives(self):
-        dt = np.gradient(self.averaged_data["Average Time (s)"])
-        dD = np.gradient(self.averaged_data["Average Displacement (um)"])
+        points = get_baseline_engine(self.baseline_method)["points"]
+        cycles = []
+        values = []
+        times = []
 
-        self.averaged_data["dD/dt"] = dD / dt
+        for cycle, frame in iter_cycles(
+            iter_ec_lab(file_str, chunksize, dtype=self.dtype)
+        ):
+            disp = frame["Analog IN 1/V"].to_numpy()
+            if self.zero_val is None:
+                self.zero_val = disp[0]
+
+            # Baseline points exclude the first cycle
+            if cycles:
+                idx = extremum_row(disp, points)
+                values.append(disp[idx] - self.zero_val)
+                times.append(frame["time/s"].to_numpy()[idx])
+
+            cycles.append(cycle)
+
+        self.cycle_num = np.array(cycles)
+        fit = self.fit_baseline(times, values)
+        self.check_average_mode()
+
+        averaged = range(self.skip_first, len(cycles) - self.skip_last)
+        accumulator = CycleAccumulator(n_channels=6)
+        offset = None
+        reference = None
+        lags = []
+
+        cycle_frames = iter_cycles(iter_ec_lab(file_str, chunksize, dtype=self.dtype))
+        for pos, (_, frame) in enumerate(cycle_frames):
+            if pos == 0:
+                continue
+            if pos >= averaged.stop:
+                break
+
+            time = frame["time/s"].to_numpy()
+            y = frame["Analog IN 1/V"].to_numpy() - self.zero_val
+            y_minus_fit = y - fit(time)
+
+            # Same renormalization as subtract_baseline, relative to the first value after the first cycle
+            if offset is None:
+                offset = y_minus_fit[0]
+
+            if pos not in averaged:
+                continue
+
+            channels = self.cycle_channels(
+                time,
+                frame["Ewe/V"].to_numpy(),
+                frame["<I>/mA"].to_numpy(),
+                frame["(Q-Qo)/C"].to_numpy(),
+                y_minus_fit - offset,
+            )
+            if self.align_cycles:
+                if reference is None:
+                    reference = channels[:, 1]
+                channels, lag = self.align_channels(channels, reference)
+                lags.append(lag)
+            accumulator.push(channels)
+
+        self.set_cycle_lags(self.cycle_num[averaged], lags)
+        self.averaged_data = accumulator.frame()
+        self.completed.update(self.data_stages)
@@ -0,0 +1,135 @@
+import io
+import os
+
+import pandas as pd
+
+# Columns used by the processing pipeline, everything else in an EC-Lab export is skipped
+REQUIRED_COLUMNS = [
+    "time/s",
+    "Ewe/V",
+    "<I>/mA",
+    "(Q-Qo)/C",
+    "cycle number",
+    "Analog IN 1/V",
+]
+
+# EC-Lab writes its exports with the Windows code page, latin-1 decodes every byte
+ENCODING = "latin-1"
+
+try:
+    import pyarrow
+    from pyarrow import csv as pa_csv
+
+    DEFAULT_ENGINE = "pyarrow"
+except ImportError:
+    DEFAULT_ENGINE = "c"
+
+
+def read_header(f):
+    """
+    Advance an open EC-Lab .mpt/.txt export past its preamble and return the
+    column names, leaving the file positioned at the first row of data.
+    """
+    line = f.readline().decode(ENCODING)
+
+    if line.startswith("EC-Lab ASCII FILE"):
+        # .mpt preamble, "Nb header lines : N" counts every line up to
+        # and including the column names
+        n_header = int(f.readline().decode(ENCODING).split(":")[1])
+        for _ in range(n_header - 3):
+            f.readline()
+        line = f.readline().decode(ENCODING)
+
+    return line.rstrip("\r\n").split("\t")
+
+
+def check_columns(file_str, header, columns):
+    missing = [col for col in columns if col not in header]
+    if missing:
+        raise ValueError(
+            f"{os.path.basename(file_str)} is missing required columns: "
+            f"{', '.join(missing)}"
+        )
+
+
+def _read_pyarrow(f, header, columns, dtype):
+    # Multithreaded arrow parser, the preamble has already been consumed so the
+    # column names are supplied instead of read from the file
+    table = pa_csv.read_csv(
+        f,
+        read_options=pa_csv.ReadOptions(column_names=header),
+        parse_options=pa_csv.ParseOptions(delimiter="\t"),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=columns,
+            column_types={col: pyarrow.from_numpy_dtype(dtype) for col in columns},
+        ),
+    )
+    return table.to_pandas()
+
+
+def load_ec_lab(file_str, columns=REQUIRED_COLUMNS, dtype="float64", engine=None):
+    """
+    Read only the required columns of an EC-Lab export with explicit float dtypes.
+    The arrow parser is used when pyarrow is installed.
+    """
+    engine = engine or DEFAULT_ENGINE
+
+    with open(file_str, "rb") as f:
+        header = read_header(f)
+
+        check_columns(file_str, header, columns)
+
+        if engine == "pyarrow":
+            return _read_pyarrow(f, header, columns, dtype)
+
+        # Data rows end with a trailing tab, index_col=False stops pandas from
+        # turning the first column into an index
+        return pd.read_csv(
+            f,
+            sep="\t",
+            header=None,
+            names=header,
+            usecols=columns,
+            dtype={col: dtype for col in columns},
+            encoding=ENCODING,
+            engine=engine,
+            index_col=False,
+        )
+
+
+def iter_ec_lab(file_str, chunksize, columns=REQUIRED_COLUMNS, dtype="float64"):
+    """
+    Read an EC-Lab export in chunks of `chunksize` rows.
+    """
+    with open(file_str, "rb") as f:
+        header = read_header(f)
+        check_columns(file_str, header, columns)
+
+        with pd.read_csv(
+            f,
+            sep="\t",
+            header=None,
+            names=header,
+            usecols=columns,
+            dtype={col: dtype for col in columns},
+            encoding=ENCODING,
+            index_col=False,
+            chunksize=chunksize,
+        ) as reader:
+            yield from reader
+
+
+def parse_rows(block, header, columns=REQUIRED_COLUMNS, dtype="float64"):
+    """
+    Parse a block of complete data lines (bytes) from an EC-Lab export.
+    """
+    return pd.read_csv(
+        io.BytesIO(block),
+        sep="\t",
+        header=None,
+        names=header,
+        usecols=columns,
+        dtype={col: dtype for col in columns},
+        encoding=ENCODING,
+        index_col=False,
+    )
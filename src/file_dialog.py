@@ -1,8 +1,10 @@
 import traceback, textwrap
 
-from dilatometry import Dilatometry
+from batch import duplicate_labels, process_files
+from live import LiveDilatometry
 from ui_elements import BaseWindow, ModifableTable
 from main_window import MainWindow
+from plot_data import plot_cache
 from spinner_widget import QtWaitingSpinner
 
 from PyQt5.QtCore import Qt, QThreadPool, QRunnable, QObject, pyqtSignal
@@ -38,33 +40,35 @@ class WorkerSignals(QObject):
     finished = pyqtSignal()
     error = pyqtSignal(str)
     result = pyqtSignal(object)
+    progress = pyqtSignal(str, int, int)
 
 
 class Worker(QRunnable):
-    def __init__(self, dialog, file_params, ref_thickness):
+    def __init__(self, dialog, file_params, ref_thickness, workers=None):
         super(Worker, self).__init__()
         self.signals = WorkerSignals()
         self.w = dialog
-        self.file_params = file_params
-        self.ref_thickness = ref_thickness
+        self.workers = workers
+
+        # Read the tree items here on the GUI thread, only plain strings go to the worker processes
+        self.file_specs = [
+            (item.text(1), item.text(0), ref_thickness) for item in file_params
+        ]
 
     def run(self):
         try:
-            processed_data = {}
-            for idx in range(len(self.file_params)):
-                file_key = self.file_params[idx].text(1)
-                file_str = self.file_params[idx].text(0)
-
-                data = Dilatometry(ref_thickness=self.ref_thickness)
-                data.load_data(file_str=file_str)
-                data.normalize_data()
-                data.subtract_baseline()
-                data.average_data()
-                data.calc_derivatives()
+            # Each file is processed in its own worker process, results come back in file list order
+            processed_data = process_files(
+                self.file_specs,
+                workers=self.workers,
+                on_result=self.signals.progress.emit,
+            )
 
-                processed_data[file_key] = data
+            # Extract the plotted arrays here so the windows don't touch pandas
+            for data in processed_data.values():
+                plot_cache.get(data)
 
-        except Exception as err:
+        except Exception:
             self.signals.error.emit(traceback.format_exc())
 
         else:
@@ -72,6 +76,39 @@ class Worker(QRunnable):
             self.signals.finished.emit()
 
 
+class LiveWorker(QRunnable):
+    def __init__(self, dialog, file_params, ref_thickness):
+        super(LiveWorker, self).__init__()
+        self.signals = WorkerSignals()
+        self.w = dialog
+        self.file_specs = [(item.text(1), item.text(0)) for item in file_params]
+        self.ref_thickness = ref_thickness
+
+    def run(self):
+        try:
+            # Initial read of whatever has been written so far, later rows are
+            # picked up by the main window's refresh timer
+            # Files are keyed by label, a repeated label would drop a file
+            duplicates = duplicate_labels(self.file_specs)
+            if duplicates:
+                raise ValueError(f"Duplicate file labels: {', '.join(duplicates)}")
+
+            live_data = {}
+            for file_key, file_str in self.file_specs:
+                data = LiveDilatometry(file_str, ref_thickness=self.ref_thickness)
+                data.poll()
+                data.snapshot()
+                plot_cache.get(data)
+                live_data[file_key] = data
+
+        except Exception:
+            self.signals.error.emit(traceback.format_exc())
+
+        else:
+            self.signals.result.emit(live_data)
+            self.signals.finished.emit()
+
+
 class FileDialog(BaseWindow):
     def __init__(self, parent=None):
         super(FileDialog, self).__init__(parent)
@@ -148,9 +185,17 @@ class FileDialog(BaseWindow):
         self.process_btn.setEnabled(False)
         self.process_btn.clicked.connect(self.process_data)
 
+        self.live_btn = QPushButton("Live view")
+        self.live_btn.setFixedWidth(120)
+        self.live_btn.setFont(text_font)
+        self.live_btn.setToolTip("Follow files that are still being written by EC-Lab")
+        self.live_btn.setEnabled(False)
+        self.live_btn.clicked.connect(self.watch_data)
+
         bottom_layout.addWidget(mass)
         bottom_layout.addWidget(volume)
         bottom_layout.addWidget(area)
+        bottom_layout.addWidget(self.live_btn)
         bottom_layout.addWidget(self.process_btn)
 
         top.setLayout(top_layout)
@@ -172,6 +217,9 @@ class FileDialog(BaseWindow):
         self.setCentralWidget(stack)
         self.threadpool = QThreadPool()
 
+        # Number of worker processes used for processing, None uses every core
+        self.workers = None
+
     def get_files(self):
         files, _ = QFileDialog.getOpenFileNames(self)
         for idx, path in enumerate(files):
@@ -185,13 +233,15 @@ class FileDialog(BaseWindow):
             self.file_tree.setItemWidget(item, 2, file_type)
 
         self.process_btn.setEnabled(True)
+        self.live_btn.setEnabled(True)
 
-    def process_data(self):
+    def start_processing(self):
+        # Shared setup for processing and live view, returns None if no thickness was entered
         try:
             ref_thickness = float(self.baseline_input.text())
         except ValueError:
             exception_handler("Please enter a value for the elecrode thickness")
-            return
+            return None
 
         self.stack_layout.setCurrentIndex(1)
         self.spinner.start()
@@ -202,16 +252,47 @@ class FileDialog(BaseWindow):
             item = root.child(i)
             self.file_params.append(item)
 
+        return ref_thickness
+
+    def process_data(self):
+        ref_thickness = self.start_processing()
+        if ref_thickness is None:
+            return
+
         worker = Worker(
             dialog=self,
             file_params=self.file_params,
             ref_thickness=ref_thickness,
+            workers=self.workers,
         )
+        worker.signals.progress.connect(self.show_progress)
         worker.signals.result.connect(self.set_data)
         worker.signals.finished.connect(self.finish_processing)
         worker.signals.error.connect(self.process_error)
         self.threadpool.start(worker)
 
+    def watch_data(self):
+        ref_thickness = self.start_processing()
+        if ref_thickness is None:
+            return
+
+        worker = LiveWorker(
+            dialog=self,
+            file_params=self.file_params,
+            ref_thickness=ref_thickness,
+        )
+        worker.signals.result.connect(self.set_live_data)
+        worker.signals.finished.connect(self.finish_processing)
+        worker.signals.error.connect(self.process_error)
+        self.threadpool.start(worker)
+
+    def set_live_data(self, live_data):
+        self.set_data(live_data)
+        self.main_window.start_live_updates()
+
+    def show_progress(self, file_key, done, total):
+        self.statusBar().showMessage(f"Processed {file_key} ({done}/{total})")
+
     def set_data(self, processed_data):
         self.main_window = MainWindow(processed_data_dict=processed_data)
         self.main_window.initialize_window()
@@ -223,6 +304,8 @@ class FileDialog(BaseWindow):
 
     def process_error(self, error):
         self.spinner.stop()
+        self.statusBar().clearMessage()
         self.process_btn.setEnabled(False)
+        self.live_btn.setEnabled(False)
         self.file_params.clear()
         exception_handler(error=error)
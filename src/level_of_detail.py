@@ -0,0 +1,85 @@
+import numpy as np
+
+# Bins per pixel of axes width, each bin draws its minimum and maximum
+BINS_PER_PIXEL = 1
+
+
+def minmax_rows(y, n_bins):
+    """
+    Rows of the minimum and maximum of y in each of n_bins equal-length bins plus
+    the first and last row, in order. Drawing only these rows gives the same
+    envelope as the full curve at a resolution of one bin per pixel.
+    """
+    n = len(y)
+    if n <= 2 * n_bins + 2:
+        return np.arange(n)
+
+    size = -(-n // n_bins)
+    n_full = n // size
+    offsets = np.arange(n_full) * size
+
+    def extrema(values):
+        # NaN never wins, an all-NaN bin gives its first row which keeps the gap
+        nan = np.isnan(values)
+        low = np.where(nan, np.inf, values).argmin(axis=-1)
+        high = np.where(nan, -np.inf, values).argmax(axis=-1)
+        return low, high
+
+    rows = [np.array([0, n - 1])]
+    rows.extend(
+        row + offsets for row in extrema(y[: n_full * size].reshape(n_full, -1))
+    )
+    if n_full * size < n:
+        rows.append(n_full * size + np.array(extrema(y[n_full * size :])))
+    return np.unique(np.concatenate(rows))
+
+
+class LevelOfDetail:
+    # Keeps the full-resolution data of a Line2D and draws a min/max decimated
+    # version sized to the axes pixel width. The visible part is re-decimated from
+    # the full arrays on every zoom/pan and canvas resize, so the drawn point count
+    # stays bounded by the screen size. x has to be sorted (e.g. time) to decimate
+    # only the visible range, otherwise the whole curve is decimated
+    def __init__(self, line, x, y, bins_per_pixel=BINS_PER_PIXEL):
+        self.line = line
+        self.axes = line.axes
+        self.bins_per_pixel = bins_per_pixel
+        self.set_data(x, y, update=False)
+
+        self.axes.callbacks.connect("xlim_changed", self.update)
+        line.figure.canvas.mpl_connect("resize_event", self.update)
+        self.update()
+
+    def set_data(self, x, y, update=True):
+        # New full-resolution data
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.sorted = len(self.x) < 2 or bool(np.all(np.diff(self.x) >= 0))
+        if update:
+            self.update()
+
+    def extend_data(self, x, y):
+        # The current data with samples appended (e.g. a file that is still being
+        # written), only the boundary sample and the new tail are checked for order
+        tail = np.asarray(x[max(len(self.x) - 1, 0) :], dtype=float)
+        self.sorted = self.sorted and bool(np.all(np.diff(tail) >= 0))
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.update()
+
+    def visible_rows(self):
+        # Full range while autoscaling (so relim sees the whole curve), else the
+        # rows inside the x limits plus one on either side to reach the edges
+        if not self.sorted or self.axes.get_autoscalex_on():
+            return 0, len(self.x)
+
+        x0, x1 = sorted(self.axes.get_xlim())
+        start = max(np.searchsorted(self.x, x0, side="left") - 1, 0)
+        stop = min(np.searchsorted(self.x, x1, side="right") + 1, len(self.x))
+        return start, stop
+
+    def update(self, *args):
+        start, stop = self.visible_rows()
+        n_bins = max(int(self.axes.bbox.width * self.bins_per_pixel), 1)
+        rows = start + minmax_rows(self.y[start:stop], n_bins)
+        self.line.set_data(self.x[rows], self.y[rows])
@@ -0,0 +1,236 @@
+import numpy as np
+import pandas as pd
+
+from averaging import CycleAccumulator
+from baseline import extremum_row, fit_linear, get_baseline_engine
+from cycle_index import CycleIndex
+from dilatometry import Dilatometry
+from ec_lab import REQUIRED_COLUMNS, parse_rows, read_header
+
+# Interval between polls of a file that is still being written, in ms
+LIVE_REFRESH_MS = 2000
+
+
+class GrowingArray:
+    # Append-only float array with amortized O(1) appends, view() returns the
+    # filled part without copying
+    def __init__(self, capacity=1024):
+        self.buffer = np.empty(capacity)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, values):
+        values = np.asarray(values, dtype=float)
+        needed = self.size + len(values)
+        if needed > len(self.buffer):
+            grown = np.empty(max(needed, 2 * len(self.buffer)))
+            grown[: self.size] = self.buffer[: self.size]
+            self.buffer = grown
+        self.buffer[self.size : needed] = values
+        self.size = needed
+
+    def view(self):
+        return self.buffer[: self.size]
+
+
+class TailReader:
+    # Reads the rows appended to an EC-Lab export since the previous call. Only
+    # complete lines are parsed, a partially written last line is left for the next read
+    def __init__(self, file_str, columns=REQUIRED_COLUMNS):
+        self.file_str = file_str
+        self.columns = columns
+        self.header = None
+        self.offset = 0
+
+    def read_new(self):
+        with open(self.file_str, "rb") as f:
+            if self.header is None:
+                try:
+                    header = read_header(f)
+                except (ValueError, IndexError):
+                    # Preamble still being written
+                    return None
+
+                # Column names line not completely written yet
+                end = f.tell()
+                if end == 0:
+                    return None
+                f.seek(end - 1)
+                if f.read(1) != b"\n":
+                    return None
+
+                # Preamble written up to a line boundary but not yet up to the
+                # column names
+                if any(col not in header for col in self.columns):
+                    return None
+
+                self.header = header
+                self.offset = f.tell()
+
+            f.seek(self.offset)
+            block = f.read()
+
+        end = block.rfind(b"\n")
+        if end < 0:
+            return None
+
+        self.offset += end + 1
+        return parse_rows(block[: end + 1], self.header, self.columns)
+
+
+class LiveDilatometry(Dilatometry):
+    # Incremental processing of a file that EC-Lab is still writing. Each poll only
+    # parses the newly appended rows. Completed cycles update the baseline points/fit
+    # and are pushed into the running average one cycle later, once the next point
+    # constrains the baseline over their time span. Committed cycles are not revisited
+    # when the fit changes afterwards, so reprocess the finished file for final results
+    def __init__(self, file_str, ref_thickness, baseline_method="cubic"):
+        super(LiveDilatometry, self).__init__(ref_thickness, baseline_method)
+        self.file_str = file_str
+        self.reader = TailReader(file_str)
+
+        self.zero_val = None
+        self.cycle_num = np.array([])
+        self.cycles = []
+        self.pending = []
+        self.current = None
+        self.held = None
+
+        self.baseline_values = []
+        self.baseline_times = []
+        self.fit = None
+        self.offset = None
+        self.accumulator = CycleAccumulator(n_channels=6)
+        self.commits = 0
+
+        # Row bookkeeping: first row of the cycle in progress and the rows covered
+        # by committed (baseline subtracted) cycles
+        self.cycle_start_row = 0
+        self.baseline_rows = [None, None]
+
+        self.raw = {name: GrowingArray() for name in REQUIRED_COLUMNS}
+        self.series = {
+            "time/s": GrowingArray(),
+            "Percent change displacement (total)": GrowingArray(),
+            "baseline time/s": GrowingArray(),
+            "Displacement minus baseline": GrowingArray(),
+            "Percent change minus baseline": GrowingArray(),
+        }
+
+    def poll(self):
+        """
+        Read and process newly appended rows, returns True if there were any.
+        """
+        rows = self.reader.read_new()
+        if rows is None or len(rows) == 0:
+            return False
+
+        disp = rows["Analog IN 1/V"].to_numpy()
+        if self.zero_val is None:
+            self.zero_val = disp[0]
+
+        for name in REQUIRED_COLUMNS:
+            self.raw[name].append(rows[name].to_numpy())
+        self.series["time/s"].append(rows["time/s"].to_numpy())
+        self.series["Percent change displacement (total)"].append(
+            (disp - self.zero_val) / abs(self.ref_thickness) * 100
+        )
+
+        index = CycleIndex(rows["cycle number"])
+        for pos in range(len(index)):
+            cycle = index.cycles[pos]
+            if self.pending and cycle != self.current:
+                self.complete_cycle(pd.concat(self.pending, ignore_index=True))
+                self.pending = []
+            self.pending.append(rows.iloc[index.rows(pos)])
+            self.current = cycle
+
+        return True
+
+    def complete_cycle(self, frame):
+        start = self.cycle_start_row
+        self.cycle_start_row += len(frame)
+        self.cycles.append(self.current)
+        self.cycle_num = np.array(self.cycles)
+
+        # First cycle is excluded from the baseline and the average
+        if len(self.cycles) == 1:
+            return
+
+        disp = frame["Analog IN 1/V"].to_numpy()
+        idx = extremum_row(disp, get_baseline_engine(self.baseline_method)["points"])
+        self.baseline_values.append(disp[idx] - self.zero_val)
+        self.baseline_times.append(frame["time/s"].to_numpy()[idx])
+        self.fit = self.fit_live_baseline()
+
+        if self.held is not None:
+            self.commit_cycle(*self.held)
+        self.held = (frame, start)
+
+    def fit_live_baseline(self):
+        # Use lower order fits until enough cycles completed for the selected engine
+        if (
+            len(self.baseline_values)
+            >= get_baseline_engine(self.baseline_method)["min_points"]
+        ):
+            return self.fit_baseline(self.baseline_times, self.baseline_values)
+        if len(self.baseline_values) >= 2:
+            return fit_linear(self.baseline_times, self.baseline_values)
+        return lambda x: np.full(np.shape(x), self.baseline_values[0])
+
+    def commit_cycle(self, frame, start):
+        time = frame["time/s"].to_numpy()
+        y_minus_fit = (frame["Analog IN 1/V"].to_numpy() - self.zero_val) - self.fit(
+            time
+        )
+
+        if self.offset is None:
+            self.offset = y_minus_fit[0]
+            self.baseline_rows[0] = start
+        self.baseline_rows[1] = start + len(frame)
+
+        disp = y_minus_fit - self.offset
+        percent_disp = disp / abs(self.ref_thickness) * 100
+
+        self.series["baseline time/s"].append(time)
+        self.series["Displacement minus baseline"].append(disp)
+        self.series["Percent change minus baseline"].append(percent_disp)
+
+        self.accumulator.push(
+            self.cycle_channels(
+                time,
+                frame["Ewe/V"].to_numpy(),
+                frame["<I>/mA"].to_numpy(),
+                frame["(Q-Qo)/C"].to_numpy(),
+                disp,
+            )
+        )
+        self.averaged_data = self.accumulator.frame()
+        self.calc_derivatives()
+        self.commits += 1
+        self.revision += 1
+
+    def snapshot(self):
+        """
+        Materialize data/data_minus_baseline tables from everything read so far,
+        e.g. for the initial plots or an export.
+        """
+        self.set_data({name: self.raw[name].view() for name in REQUIRED_COLUMNS})
+        if self.zero_val is not None:
+            self.normalize_data()
+
+        start, stop = self.baseline_rows
+        if start is None:
+            start = stop = 0
+        else:
+            for name in [
+                "Displacement minus baseline",
+                "Percent change minus baseline",
+            ]:
+                self.column(name)[start:stop] = self.series[name].view()
+
+        self.baseline_span = slice(start, stop)
+        self.build_tables(self.data["cycle number"].to_numpy())
+        self.revision += 1
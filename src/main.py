@@ -1,4 +1,4 @@
-import sys, os
+import sys, os, multiprocessing
 
 from file_dialog import FileDialog
 
@@ -35,4 +35,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # Required for the processing worker pool in the frozen (PyInstaller) build
+    multiprocessing.freeze_support()
     main()
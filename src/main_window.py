@@ -1,13 +1,18 @@
 from ui_elements import BaseWindow, FigureWindow
+from canvas_manager import CanvasManager
+from plot_data import plot_cache
+from plotting_utils import uncertainty_band
 from aggregate_window import AggregateWindow
 from derivative_window import DerivativeWindow
 from file_export import export_data
+from live import LiveDilatometry, LIVE_REFRESH_MS
 from spinner_widget import QtWaitingSpinner
 
-from PyQt5.QtCore import Qt, QThreadPool, QRunnable, QObject, pyqtSignal
+from PyQt5.QtCore import Qt, QThreadPool, QRunnable, QObject, QTimer, pyqtSignal
 from PyQt5.QtGui import QFont
 from PyQt5.QtWidgets import (
     QFileDialog,
+    QLineEdit,
     QPushButton,
     QLabel,
     QTabWidget,
@@ -18,6 +23,14 @@ from PyQt5.QtWidgets import (
 )
 
 
+class FigurePlaceholder(QLabel):
+    # Stands in for a figure until its view is first shown
+    def __init__(self, parent=None):
+        super(FigurePlaceholder, self).__init__("Loading plot...", parent)
+        self.setAlignment(Qt.AlignCenter)
+        self.setFont(QFont("Arial", 10))
+
+
 class WorkerSignals(QObject):
     finished = pyqtSignal()
     error = pyqtSignal(str, str)
@@ -40,15 +53,15 @@ class Worker(QRunnable):
                 processed_data=self.data_to_export,
             )
 
-        except:
-            pass
+        except Exception as err:
+            self.signals.error.emit(str(err), "Export failed")
 
         else:
             self.signals.finished.emit()
 
 
 class MainWindow(BaseWindow):
-    def __init__(self, processed_data_dict, parent=None):
+    def __init__(self, processed_data_dict, canvas_manager=None, parent=None):
         super(MainWindow, self).__init__(parent)
 
         self.setWindowTitle("Dilatometry Analyst")
@@ -56,6 +69,13 @@ class MainWindow(BaseWindow):
 
         self.processed_data = processed_data_dict
         self.tab_stacks = {}
+        self.live_commits = {}
+
+        # Least recently viewed figures are released past the figure/memory budget
+        # and rebuilt when shown again
+        self.canvases = (
+            canvas_manager if canvas_manager is not None else CanvasManager()
+        )
 
         self.page_layout = QVBoxLayout()
         bottom_buttons = QHBoxLayout()
@@ -99,6 +119,26 @@ class MainWindow(BaseWindow):
         spacer_1 = QWidget()
         bottom_buttons.addWidget(spacer_1)
 
+        thickness_label = QLabel("Thickness (<span>&mu;</span>m):")
+        thickness_label.setFont(QFont("Arial", 9))
+        bottom_buttons.addWidget(thickness_label)
+
+        self.thickness_input = QLineEdit()
+        self.thickness_input.setFixedHeight(41)
+        self.thickness_input.setFixedWidth(80)
+        self.thickness_input.setFont(QFont("Arial", 9))
+        if self.processed_data:
+            self.thickness_input.setText(
+                f"{next(iter(self.processed_data.values())).ref_thickness:g}"
+            )
+        bottom_buttons.addWidget(self.thickness_input)
+
+        self.thickness_button = QPushButton("Apply")
+        self.thickness_button.setFixedHeight(41)
+        self.thickness_button.setFont(QFont("Arial", 9))
+        self.thickness_button.clicked.connect(self.apply_thickness)
+        bottom_buttons.addWidget(self.thickness_button)
+
         self.aggregate_button = QPushButton("Aggregate Data")
         self.aggregate_button.setFixedHeight(41)
         self.aggregate_button.setMaximumWidth(151)
@@ -142,118 +182,280 @@ class MainWindow(BaseWindow):
         file_label.setAlignment(Qt.AlignCenter)
 
     def initialize_window(self):
-        idx = 0
-        for key in self.processed_data:
+        # Views start as placeholders and their figures are built the first time they
+        # are shown, so the window appears at once however many files were imported
+        self.builders = [
+            self.build_norm_widget,
+            self.build_baseline_widget,
+            self.build_avg_widget,
+        ]
+        for idx, key in enumerate(self.processed_data):
             preview = QWidget()
             stack = QStackedLayout()
             preview.setLayout(stack)
 
             self.tab_stacks[idx] = stack
-            idx += 1
-
-            norm_widget = FigureWindow(
-                x=self.processed_data[key].data["time/s"],
-                y=self.processed_data[key].data["Percent change displacement (total)"],
-                xlabel="Time (s)",
-                ylabel="Relative Displacement (%)",
-                title=key,
-            )
 
-            stack.addWidget(norm_widget)
+            for _ in self.builders:
+                stack.addWidget(FigurePlaceholder())
+            self.tabs.addTab(preview, key)
 
-            baseline_widget = FigureWindow(
-                x=self.processed_data[key].data_minus_baseline["time/s"],
-                y=self.processed_data[key].data_minus_baseline[
-                    "Percent change minus baseline"
-                ],
-                xlabel="Time (s)",
-                ylabel="Relative Displacement (%)",
-                title=key,
-            )
-            stack.addWidget(baseline_widget)
-
-            avg_widget = FigureWindow(
-                x=self.processed_data[key].averaged_data["Average Potential (V)"],
-                y=self.processed_data[key].averaged_data["Average Current (mA)"],
-                xlabel="Potential (V)",
-                ylabel="Averaged Current (mA)",
-                subplots=3,
-            )
+        self.tabs.currentChanged.connect(self.schedule_build)
+        self.schedule_build()
 
-            avg_plot_midpoint = (
-                avg_widget.fig.subplotpars.right + avg_widget.fig.subplotpars.left
-            ) / 2
+    def schedule_build(self):
+        # Build after returning to the event loop so the placeholder is painted first
+        QTimer.singleShot(0, self.build_current)
 
-            avg_widget.fig.suptitle(key, x=avg_plot_midpoint)
+    def build_current(self):
+        idx = self.tabs.currentIndex()
+        if idx < 0:
+            return
 
-            avg_widget.axes.errorbar(
-                self.processed_data[key].averaged_data["Average Potential (V)"],
-                self.processed_data[key].averaged_data["Average Current (mA)"],
-                yerr=self.processed_data[key].averaged_data["Current Stand Dev (mA)"],
-                color="tab:blue",
-                alpha=0.2,
-            )
+        stack = self.tab_stacks[idx]
+        pos = stack.currentIndex()
+        if not isinstance(stack.widget(pos), FigurePlaceholder):
+            self.canvases.touch((idx, pos))
+            return
+
+        key = list(self.processed_data)[idx]
+        widget = self.builders[pos](key)
+        self.replace_widget(stack, pos, widget)
+        if key in self.live_commits:
+            self.update_live_widget(idx, pos)
+        self.canvases.add((idx, pos), widget.fig, lambda: self.release_view(idx, pos))
+
+    def release_view(self, idx, pos):
+        # Drop the figure's artists right away, the widget (and its Agg canvas) is
+        # deleted by Qt
+        widget = self.tab_stacks[idx].widget(pos)
+        widget.fig.clear()
+        self.replace_widget(self.tab_stacks[idx], pos, FigurePlaceholder())
+
+    def build_norm_widget(self, key):
+        plot_data = plot_cache.get(self.processed_data[key])
+        return FigureWindow(
+            x=plot_data["time/s"],
+            y=plot_data["Percent change displacement (total)"],
+            xlabel="Time (s)",
+            ylabel="Relative Displacement (%)",
+            title=key,
+            decimate=True,
+        )
 
-            axes2 = avg_widget.fig.add_subplot(1, 3, 2)
+    def build_baseline_widget(self, key):
+        plot_data = plot_cache.get(self.processed_data[key])
+        return FigureWindow(
+            x=plot_data["baseline time/s"],
+            y=plot_data["Percent change minus baseline"],
+            xlabel="Time (s)",
+            ylabel="Relative Displacement (%)",
+            title=key,
+            decimate=True,
+        )
 
-            axes2.plot(
-                self.processed_data[key].averaged_data["Average Time (s)"],
-                self.processed_data[key].averaged_data["Average Displacement (%)"],
-            )
-            axes2.errorbar(
-                self.processed_data[key].averaged_data["Average Time (s)"],
-                self.processed_data[key].averaged_data["Average Displacement (%)"],
-                yerr=self.processed_data[key].averaged_data[
-                    "Displacement Stand Dev (%)"
-                ],
-                errorevery=2,
-                color="tab:blue",
-                alpha=0.05,
+    def build_avg_widget(self, key):
+        # Files watched in live mode have no average until enough cycles completed
+        if self.processed_data[key].averaged_data is None:
+            return FigureWindow(title=f"{key}: waiting for completed cycles")
+
+        plot_data = plot_cache.get(self.processed_data[key])
+
+        avg_widget = FigureWindow(
+            x=plot_data["Average Potential (V)"],
+            y=plot_data["Average Current (mA)"],
+            xlabel="Potential (V)",
+            ylabel="Averaged Current (mA)",
+            subplots=3,
+        )
+
+        avg_plot_midpoint = (
+            avg_widget.fig.subplotpars.right + avg_widget.fig.subplotpars.left
+        ) / 2
+
+        avg_widget.fig.suptitle(key, x=avg_plot_midpoint)
+
+        uncertainty_band(
+            avg_widget.axes,
+            plot_data["Average Potential (V)"],
+            plot_data["Average Current (mA)"],
+            plot_data["Current Stand Dev (mA)"],
+            color="tab:blue",
+            alpha=0.2,
+        )
+
+        axes2 = avg_widget.fig.add_subplot(1, 3, 2)
+
+        axes2.plot(
+            plot_data["Average Time (s)"],
+            plot_data["Average Displacement (%)"],
+        )
+        uncertainty_band(
+            axes2,
+            plot_data["Average Time (s)"],
+            plot_data["Average Displacement (%)"],
+            plot_data["Displacement Stand Dev (%)"],
+            color="tab:blue",
+            alpha=0.2,
+        )
+        axes2.set_xlabel("Time (s)")
+        axes2.set_ylabel("Averaged Relative Displacement (%)")
+
+        axes3 = avg_widget.fig.add_subplot(1, 3, 3)
+        axes3.plot(
+            plot_data["Average Potential (V)"],
+            plot_data["Average Displacement (%)"],
+        )
+        uncertainty_band(
+            axes3,
+            plot_data["Average Potential (V)"],
+            plot_data["Average Displacement (%)"],
+            plot_data["Displacement Stand Dev (%)"],
+            color="tab:blue",
+            alpha=0.2,
+        )
+
+        axes3.set_xlabel("Potential (V)")
+        axes3.set_ylabel("Averaged Relative Displacement (%)")
+
+        return avg_widget
+
+    def replace_widget(self, stack, pos, widget):
+        current = stack.currentIndex()
+        old_widget = stack.widget(pos)
+        stack.removeWidget(old_widget)
+        old_widget.deleteLater()
+        stack.insertWidget(pos, widget)
+        stack.setCurrentIndex(current)
+
+    def apply_thickness(self):
+        try:
+            ref_thickness = float(self.thickness_input.text())
+        except ValueError:
+            self.statusBar().showMessage(
+                "Please enter a value for the electrode thickness"
             )
-            axes2.set_xlabel("Time (s)")
-            axes2.set_ylabel("Averaged Relative Displacement (%)")
+            return
+
+        self.update_parameters(ref_thickness=ref_thickness)
+
+    def update_parameters(self, **params):
+        """
+        Change processing parameters (see Dilatometry.update) of every dataset in
+        place, only the affected processing stages are recomputed.
+        """
+        for data in self.processed_data.values():
+            data.update(**params)
+
+        # Only the view on screen is rebuilt now, the others when next shown
+        for idx, stack in self.tab_stacks.items():
+            for pos in range(len(self.builders)):
+                if not isinstance(stack.widget(pos), FigurePlaceholder):
+                    self.canvases.discard((idx, pos))
+                    self.replace_widget(stack, pos, FigurePlaceholder())
+        self.build_current()
+
+        self.statusBar().clearMessage()
+
+    def start_live_updates(self, interval=LIVE_REFRESH_MS):
+        # Poll files that are still being written, plots refresh at most once per interval
+        self.live_commits = {
+            key: data.commits
+            for key, data in self.processed_data.items()
+            if isinstance(data, LiveDilatometry)
+        }
+        self.live_timer = QTimer(self)
+        self.live_timer.timeout.connect(self.refresh_live)
+        self.live_timer.start(interval)
+
+        # Live data is processed incrementally and can't be reprocessed in place
+        self.thickness_input.setEnabled(False)
+        self.thickness_button.setEnabled(False)
+
+    def refresh_live(self):
+        for idx, key in enumerate(self.processed_data):
+            data = self.processed_data[key]
+            if key not in self.live_commits:
+                continue
+
+            # A failed poll (e.g. file locked by the writer) is retried on the next tick
+            try:
+                if not data.poll():
+                    continue
+            except Exception as err:
+                self.statusBar().showMessage(f"Could not read {key}: {err}")
+                continue
+
+            self.update_live_widget(idx, 0)
+            self.update_live_widget(idx, 1)
+
+            # The averaged figure only changes when another cycle was committed
+            stack = self.tab_stacks[idx]
+            if data.commits != self.live_commits[key]:
+                self.live_commits[key] = data.commits
+                if not isinstance(stack.widget(2), FigurePlaceholder):
+                    widget = self.build_avg_widget(key)
+                    self.replace_widget(stack, 2, widget)
+                    self.canvases.replace((idx, 2), widget.fig)
+
+    def update_live_widget(self, idx, pos):
+        # Views not built yet are built from the latest series when shown
+        data = self.processed_data[list(self.processed_data)[idx]]
+        widget = self.tab_stacks[idx].widget(pos)
+        if isinstance(widget, FigurePlaceholder):
+            return
 
-            axes3 = avg_widget.fig.add_subplot(1, 3, 3)
-            axes3.plot(
-                self.processed_data[key].averaged_data["Average Potential (V)"],
-                self.processed_data[key].averaged_data["Average Displacement (%)"],
+        if pos == 0:
+            self.update_line(
+                widget,
+                data.series["time/s"].view(),
+                data.series["Percent change displacement (total)"].view(),
             )
-            axes3.errorbar(
-                self.processed_data[key].averaged_data["Average Potential (V)"],
-                self.processed_data[key].averaged_data["Average Displacement (%)"],
-                yerr=self.processed_data[key].averaged_data[
-                    "Displacement Stand Dev (%)"
-                ],
-                errorevery=2,
-                color="tab:blue",
-                alpha=0.05,
+        elif pos == 1:
+            self.update_line(
+                widget,
+                data.series["baseline time/s"].view(),
+                data.series["Percent change minus baseline"].view(),
             )
 
-            axes3.set_xlabel("Potential (V)")
-            axes3.set_ylabel("Averaged Relative Displacement (%)")
-
-            stack.addWidget(avg_widget)
-            self.tabs.addTab(preview, key)
+    def update_line(self, widget, x, y):
+        widget.lod.extend_data(x, y)
+        widget.axes.relim()
+        widget.axes.autoscale_view()
+        widget.canvas.draw_idle()
 
     def show_norm_data(self):
         idx = self.tabs.currentIndex()
         self.tab_stacks[idx].setCurrentIndex(0)
+        self.schedule_build()
 
     def show_base_data(self):
         idx = self.tabs.currentIndex()
         self.tab_stacks[idx].setCurrentIndex(1)
+        self.schedule_build()
 
     def show_avg_data(self):
         idx = self.tabs.currentIndex()
         self.tab_stacks[idx].setCurrentIndex(2)
+        self.schedule_build()
+
+    def averaged_datasets(self):
+        # Live files without any committed cycles yet have nothing to aggregate
+        return {
+            key: data
+            for key, data in self.processed_data.items()
+            if data.averaged_data is not None
+        }
 
     def show_aggregate_data(self):
-        self.aggregate_window = AggregateWindow(aggregate_data=self.processed_data)
+        self.aggregate_window = AggregateWindow(aggregate_data=self.averaged_datasets())
         self.aggregate_window.update_plots()
         self.aggregate_window.show()
 
     def show_derivative_data(self):
-        self.derivative_window = DerivativeWindow(derivative_data=self.processed_data)
+        self.derivative_window = DerivativeWindow(
+            derivative_data=self.averaged_datasets()
+        )
         self.derivative_window.show()
 
     def get_export_location(self):
@@ -262,6 +464,11 @@ class MainWindow(BaseWindow):
             return
         file_name = file_name.strip(".xlsx")
 
+        # Live data only builds its full tables on demand
+        for data in self.processed_data.values():
+            if isinstance(data, LiveDilatometry):
+                data.snapshot()
+
         self.stack_layout.setCurrentIndex(1)
         self.spinner.start()
         worker = Worker(
@@ -277,6 +484,7 @@ class MainWindow(BaseWindow):
 
     def process_error(self, error, title):
         self.spinner.stop()
+        self.statusBar().showMessage(f"{title}: {error}")
         # exception_handler(
         #     error=error,
         #     window_title=title,
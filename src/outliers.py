@@ -0,0 +1,70 @@
+import numpy as np
+
+from scipy.ndimage import median_filter
+
+# Rolling window (points) and threshold (robust standard deviations) of the
+# automatic outlier detection
+OUTLIER_WINDOW = 15
+OUTLIER_THRESHOLD = 5
+
+# Edits kept for undo
+UNDO_LIMIT = 100
+
+
+def detect_outliers(y, window=OUTLIER_WINDOW, threshold=OUTLIER_THRESHOLD):
+    """
+    Flag spikes as points further than `threshold` robust standard deviations
+    (1.4826 x the rolling median absolute deviation) from the rolling median.
+    Non-finite points are never flagged.
+    """
+    y = np.asarray(y, dtype=float)
+    flags = np.zeros(len(y), dtype=bool)
+    finite = np.isfinite(y)
+    if finite.sum() < 3:
+        return flags
+
+    values = y[finite]
+    median = median_filter(values, size=window, mode="nearest")
+    deviation = np.abs(values - median)
+    mad = median_filter(deviation, size=window, mode="nearest")
+
+    # Flat stretches have no spread of their own, use the curve-wide MAD there
+    scale = 1.4826 * np.where(mad > 0, mad, np.median(deviation))
+    flags[finite] = (scale > 0) & (deviation > threshold * scale)
+    return flags
+
+
+class PointMask:
+    # Boolean keep-mask over the points of a curve. Points are removed by masking
+    # them out, every removal is one undoable edit
+    def __init__(self, n_points, keep=None):
+        if keep is None:
+            keep = np.ones(n_points, dtype=bool)
+        self.keep = np.array(keep, dtype=bool)
+        self.history = []
+
+    @property
+    def kept(self):
+        # Positions of the points still shown
+        return np.flatnonzero(self.keep)
+
+    def remove(self, indices):
+        """
+        Mask out points by their position in the full curve as a single edit,
+        returns the number of points removed.
+        """
+        indices = np.asarray(indices, dtype=int)
+        indices = indices[self.keep[indices]]
+        if len(indices) == 0:
+            return 0
+
+        self.history.append(self.keep.copy())
+        del self.history[:-UNDO_LIMIT]
+        self.keep[indices] = False
+        return len(indices)
+
+    def undo(self):
+        if not self.history:
+            return False
+        self.keep = self.history.pop()
+        return True
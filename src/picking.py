@@ -0,0 +1,62 @@
+import numpy as np
+
+from scipy.spatial import cKDTree
+
+# Pick radius in screen pixels
+PICK_RADIUS = 5
+
+
+class PointPicker:
+    """
+    Picker for a Line2D, line.set_picker(PointPicker()). Looks up the nearest
+    vertex in a KD-tree of the line's points in screen coordinates instead of
+    testing every vertex on each click. The tree is rebuilt lazily, on the first
+    pick after the data, the view limits or the canvas size changed.
+    """
+
+    def __init__(self, radius=PICK_RADIUS):
+        self.radius = radius
+        self.tree = None
+        self.rows = None
+        self.key = None
+        self.xy = None
+
+    def __call__(self, line, mouseevent):
+        if mouseevent.inaxes is not line.axes or not line.get_visible():
+            return False, {}
+
+        ind = self.nearest(line, mouseevent.x, mouseevent.y)
+        if ind is None:
+            return False, {}
+        return True, {"ind": np.array([ind])}
+
+    def nearest(self, line, x, y):
+        # Index into the line's data of the closest point within the radius, or None
+        tree = self.build(line)
+        if tree is None:
+            return None
+
+        distance, pos = tree.query([x, y], distance_upper_bound=self.radius)
+        if not np.isfinite(distance):
+            return None
+        return self.rows[pos]
+
+    def build(self, line):
+        # get_xydata() is a new array whenever the line data change, the array is
+        # kept with the key so its id can't be reused while the key is alive
+        xy = line.get_xydata()
+        key = (
+            id(xy),
+            line.axes.get_xlim(),
+            line.axes.get_ylim(),
+            tuple(line.axes.bbox.bounds),
+        )
+        if key == self.key:
+            return self.tree
+
+        screen = line.get_transform().transform(xy)
+        self.rows = np.flatnonzero(np.isfinite(screen).all(axis=1))
+        self.tree = cKDTree(screen[self.rows]) if len(self.rows) else None
+        self.key = key
+        self.xy = xy
+        return self.tree
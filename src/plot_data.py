@@ -0,0 +1,78 @@
+import weakref
+
+import numpy as np
+
+# Plotted columns of the data tables: (table attribute, column) per quantity
+TABLE_QUANTITIES = {
+    "time/s": ("data", "time/s"),
+    "Percent change displacement (total)": (
+        "data",
+        "Percent change displacement (total)",
+    ),
+    "baseline time/s": ("data_minus_baseline", "time/s"),
+    "Percent change minus baseline": (
+        "data_minus_baseline",
+        "Percent change minus baseline",
+    ),
+}
+
+AVERAGED_QUANTITIES = [
+    "Average Time (s)",
+    "Average Potential (V)",
+    "Average Current (mA)",
+    "Current Stand Dev (mA)",
+    "Average Charge (C)",
+    "Average Displacement (%)",
+    "Displacement Stand Dev (%)",
+]
+
+
+class PlotData:
+    # Contiguous float arrays of every plotted quantity of one dataset and their
+    # (min, max), taken from the pandas tables once so the windows never index
+    # DataFrames while drawing. Columns of the shared float64 buffer are views, not
+    # copies. "dD/dt" is the unmasked derivative, see Dilatometry.derivative
+    def __init__(self, data):
+        self.revision = data.revision
+        self.arrays = {}
+
+        for name, (table, column) in TABLE_QUANTITIES.items():
+            frame = getattr(data, table)
+            if frame is not None:
+                self.arrays[name] = np.ascontiguousarray(frame[column], dtype=float)
+
+        if data.averaged_data is not None:
+            for name in AVERAGED_QUANTITIES:
+                self.arrays[name] = np.ascontiguousarray(
+                    data.averaged_data[name], dtype=float
+                )
+        if data.derivative is not None:
+            self.arrays["dD/dt"] = np.ascontiguousarray(data.derivative, dtype=float)
+
+        self.limits = {}
+        for name, values in self.arrays.items():
+            finite = values[np.isfinite(values)]
+            if len(finite):
+                self.limits[name] = (finite.min(), finite.max())
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    def __contains__(self, name):
+        return name in self.arrays
+
+
+class PlotDataCache:
+    # PlotData per dataset shared by all windows, rebuilt when the dataset was
+    # reprocessed (its revision changed). Entries go away with their dataset
+    def __init__(self):
+        self.entries = weakref.WeakKeyDictionary()
+
+    def get(self, data):
+        plot_data = self.entries.get(data)
+        if plot_data is None or plot_data.revision != data.revision:
+            plot_data = self.entries[data] = PlotData(data)
+        return plot_data
+
+
+plot_cache = PlotDataCache()
@@ -4,6 +4,9 @@ import matplotlib.cm
 from matplotlib.colors import LinearSegmentedColormap, ListedColormap
 from matplotlib.pyplot import cycler
 
+# Samples of an uncertainty band drawn at most, longer curves are decimated
+MAX_BAND_POINTS = 2000
+
 
 def get_color_cycle(cmap, N=None, use_index="auto"):
     if isinstance(cmap, str):
@@ -41,3 +44,23 @@ def get_color_cycle(cmap, N=None, use_index="auto"):
     else:
         colors = cmap(np.linspace(0, 1, N))
         return cycler("color", colors)
+
+
+def uncertainty_band(axes, x, y, err, max_points=MAX_BAND_POINTS, **kwargs):
+    """
+    Draw y +/- err around a curve as a single filled polygon (one draw call)
+    instead of an errorbar line per sample. Curves with more than max_points
+    samples are decimated to every n-th sample, keeping the largest deviation
+    of each group of n so the band doesn't get narrower.
+    """
+    x, y, err = (np.asarray(values, dtype=float) for values in (x, y, err))
+
+    step = -(-len(x) // max_points) if max_points else 1
+    if step > 1:
+        starts = np.arange(0, len(x), step)
+        rows = np.append(starts, len(x) - 1)
+        widest = np.append(np.fmax.reduceat(err, starts), err[-1])
+        x, y, err = x[rows], y[rows], widest
+
+    kwargs.setdefault("linewidth", 0)
+    return axes.fill_between(x, y - err, y + err, **kwargs)
@@ -0,0 +1,100 @@
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+
+from scipy.ndimage import convolve1d
+from scipy.signal import savgol_coeffs
+
+# Smoothed results kept per curve, the least recently used window lengths are dropped first
+MEMO_SIZE = 64
+
+
+@lru_cache(maxsize=256)
+def savgol_kernels(window, order, deriv=0):
+    """
+    Savitzky-Golay convolution coefficients for (window, order, deriv), plus the
+    matrices that evaluate the polynomial fitted to the first/last window at the
+    edge samples, same as scipy.signal.savgol_filter's default "interp" mode.
+    """
+    coeffs = savgol_coeffs(window, order, deriv=deriv)
+
+    # Least squares fit of every unit vector, so fit @ samples gives the polynomial
+    # coefficients (highest power first) of any window of samples
+    t = np.arange(window, dtype=float)
+    fit = np.polyfit(t, np.eye(window), order)
+
+    # d^deriv/dt^deriv of every power of t, evaluated at the given points
+    powers = np.arange(order, -1, -1)
+    scale = np.ones(order + 1)
+    for step in range(deriv):
+        scale *= powers - step
+    exponents = np.maximum(powers - deriv, 0)
+
+    def evaluate(points):
+        return scale * points[:, None] ** exponents @ fit
+
+    half = window // 2
+    kernels = (coeffs, evaluate(t[:half]), evaluate(t[window - half :]))
+    for kernel in kernels:
+        kernel.flags.writeable = False
+    return kernels
+
+
+def savgol(y, window, order=3, deriv=0):
+    """
+    Savitzky-Golay filter of a curve using the cached kernels, gives the same
+    result as scipy.signal.savgol_filter(y, window, order, deriv).
+    """
+    y = np.asarray(y, dtype=float)
+    if window > len(y):
+        raise ValueError("The smoothing window can't be longer than the curve")
+
+    coeffs, head, tail = savgol_kernels(window, order, deriv)
+    smoothed = convolve1d(y, coeffs, mode="constant")
+
+    half = window // 2
+    if half:
+        smoothed[:half] = head @ y[:window]
+        smoothed[-half:] = tail @ y[-window:]
+    return smoothed
+
+
+def savgol_derivative(y, x, window, order=3):
+    # Smoothed dy/dx as a derivative filter. Samples don't have to be evenly spaced in x,
+    # the derivatives of y and x with respect to the sample index are taken separately
+    return savgol(y, window, order, deriv=1) / savgol(x, window, order, deriv=1)
+
+
+class SmoothedCurve:
+    # Memo of the smoothed versions of one curve keyed on window length, so moving a
+    # smoothing slider back and forth only filters each window length once
+    def __init__(self, y, order=3, size=MEMO_SIZE):
+        self.order = order
+        self.size = size
+        self.memo = OrderedDict()
+        self.set_data(y)
+
+    def set_data(self, y):
+        self.y = np.asarray(y, dtype=float)
+        self.memo.clear()
+
+    def get(self, window):
+        # Memoized result for a window length, or None
+        smoothed = self.memo.get(window)
+        if smoothed is not None:
+            self.memo.move_to_end(window)
+        return smoothed
+
+    def store(self, window, smoothed):
+        smoothed.flags.writeable = False
+        self.memo[window] = smoothed
+        if len(self.memo) > self.size:
+            self.memo.popitem(last=False)
+
+    def smooth(self, window):
+        smoothed = self.get(window)
+        if smoothed is None:
+            smoothed = savgol(self.y, window, self.order)
+            self.store(window, smoothed)
+        return smoothed
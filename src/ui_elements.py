@@ -1,17 +1,25 @@
 import matplotlib
+import numpy as np
 
-from scipy.signal import savgol_filter
 from matplotlib.figure import Figure
 from matplotlib.lines import Line2D
+from matplotlib.path import Path
+from matplotlib.widgets import LassoSelector, RectangleSelector
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
 
+from level_of_detail import LevelOfDetail
+from outliers import PointMask, detect_outliers
+from picking import PointPicker
+from smoothing import SmoothedCurve
+
 from PyQt5.QtCore import Qt, pyqtSignal, QEvent, QUrl
 from PyQt5.QtGui import QDesktopServices, QFont
 from PyQt5.QtWidgets import (
     QAction,
     QLabel,
     QMainWindow,
+    QPushButton,
     QSlider,
     QTreeWidget,
     QWidget,
@@ -61,6 +69,9 @@ class ModifableTable(QTreeWidget):
 
 
 class FigureWindow(QMainWindow):
+    # Emitted after points of an editable (smoothing=True) curve were removed or restored
+    edited = pyqtSignal()
+
     def __init__(
         self,
         width=12,
@@ -74,6 +85,8 @@ class FigureWindow(QMainWindow):
         title=None,
         subplots=1,
         smoothing=False,
+        mask=None,
+        decimate=False,
         parent=None,
     ):
         super(QMainWindow, self).__init__(parent)
@@ -88,7 +101,17 @@ class FigureWindow(QMainWindow):
         self.axes.set_title(title)
 
         if x is not None and y is not None:
-            self.axes.plot(x, y, label=curve_label, picker=True, pickradius=5)
+            # Long raw time series are drawn decimated to the canvas width
+            (line,) = self.axes.plot(
+                [] if decimate else x,
+                [] if decimate else y,
+                label=curve_label,
+                picker=PointPicker(),
+            )
+            if decimate:
+                self.lod = LevelOfDetail(line, x, y)
+                self.axes.relim()
+                self.axes.autoscale_view()
 
         if xlabel and ylabel:
             self.axes.set_xlabel(xlabel)
@@ -111,6 +134,26 @@ class FigureWindow(QMainWindow):
             self.smoothing_slider.valueChanged.connect(self.smooth_curve)
             slider_container_layout.addWidget(self.smoothing_slider)
 
+            self.box_button = QPushButton("Box delete")
+            self.box_button.setCheckable(True)
+            self.box_button.toggled.connect(self.toggle_box_select)
+            self.lasso_button = QPushButton("Lasso delete")
+            self.lasso_button.setCheckable(True)
+            self.lasso_button.toggled.connect(self.toggle_lasso_select)
+            detect_button = QPushButton("Auto outliers")
+            detect_button.clicked.connect(self.remove_detected_outliers)
+            undo_button = QPushButton("Undo")
+            undo_button.clicked.connect(self.undo_edit)
+
+            for button in [
+                self.box_button,
+                self.lasso_button,
+                detect_button,
+                undo_button,
+            ]:
+                button.setFont(QFont("Arial", 9))
+                slider_container_layout.addWidget(button)
+
             layout.addWidget(slider_container)
 
         self.canvas = FigureCanvas(self.fig)
@@ -134,10 +177,24 @@ class FigureWindow(QMainWindow):
             self.xoffset, self.yoffset = -20, 20
             self.text_template = "x: %0.2f\ny: %0.2f"
 
+            # Full curve as arrays, removed points are masked out by the (possibly
+            # shared) keep-mask and only the kept points are drawn
             self.outlier = None
             self.line = self.axes.lines[0]
-            self.x_data = list(self.line.get_xdata())
-            self.y_data = list(self.line.get_ydata())
+            self.x_data = np.asarray(x, dtype=float)
+            self.y_data = np.asarray(y, dtype=float)
+            self.mask = mask if mask is not None else PointMask(len(self.y_data))
+            self.smoothed = SmoothedCurve(self.y_data)
+            self.smoothing_applied = False
+
+            self.box_selector = RectangleSelector(
+                self.axes, self.delete_box, useblit=True, button=[1]
+            )
+            self.box_selector.set_active(False)
+            self.lasso_selector = LassoSelector(
+                self.axes, self.delete_lasso, useblit=True, button=[1]
+            )
+            self.lasso_selector.set_active(False)
 
             self.annotation = self.axes.annotate(
                 self.text_template,
@@ -154,6 +211,9 @@ class FigureWindow(QMainWindow):
             self.fig.canvas.mpl_connect("pick_event", self.point_pick)
             self.fig.canvas.mpl_connect("key_press_event", self.delete_outlier)
 
+            if not self.mask.keep.all():
+                self.refresh_curve()
+
     def eventFilter(self, obj, event):
         if event.type() == QEvent.Enter:
             self.opac.setOpacity(1.0)
@@ -167,7 +227,8 @@ class FigureWindow(QMainWindow):
     def point_pick(self, event):
         if isinstance(event.artist, Line2D):
             self.artist = event.artist
-            self.outlier = event.ind[0]
+            # Picked index is into the drawn (kept) points
+            self.outlier = self.mask.kept[event.ind[0]]
             self.x_annot, self.y_annot = (
                 self.artist.get_xdata()[event.ind[0]],
                 self.artist.get_ydata()[event.ind[0]],
@@ -179,18 +240,76 @@ class FigureWindow(QMainWindow):
 
     def delete_outlier(self, event):
         if event.key == "delete" and self.outlier is not None:
-            self.x_data.pop(self.outlier)
-            self.y_data.pop(self.outlier)
-            self.line.set_data(self.x_data, self.y_data)
-            self.outlier = None
-            self.annotation.set_visible(False)
-            self.smoothing_slider.setValue(4)
-            self.axes.relim()
-            self.axes.autoscale_view()
-            event.canvas.draw_idle()
+            self.remove_points([self.outlier])
+        elif event.key == "ctrl+z":
+            self.undo_edit()
+
+    def toggle_box_select(self, checked):
+        if checked:
+            self.lasso_button.setChecked(False)
+        self.box_selector.set_active(checked)
+
+    def toggle_lasso_select(self, checked):
+        if checked:
+            self.box_button.setChecked(False)
+        self.lasso_selector.set_active(checked)
+
+    def shown_points(self):
+        # Kept point positions and the x/y values drawn for them (smoothed if applied)
+        return self.mask.kept, self.line.get_xdata(), self.line.get_ydata()
+
+    def delete_box(self, press, release):
+        x0, x1 = sorted([press.xdata, release.xdata])
+        y0, y1 = sorted([press.ydata, release.ydata])
+        kept, x, y = self.shown_points()
+        inside = (x >= x0) & (x <= x1) & (y >= y0) & (y <= y1)
+        self.remove_points(kept[inside])
+
+    def delete_lasso(self, vertices):
+        kept, x, y = self.shown_points()
+        inside = Path(vertices).contains_points(np.column_stack([x, y]))
+        self.remove_points(kept[inside])
+
+    def remove_detected_outliers(self):
+        kept = self.mask.kept
+        self.remove_points(kept[detect_outliers(self.y_data[kept])])
+
+    def remove_points(self, indices):
+        if self.mask.remove(indices):
+            self.curve_edited()
+
+    def undo_edit(self):
+        if self.mask.undo():
+            self.curve_edited()
+
+    def curve_edited(self):
+        self.outlier = None
+        self.annotation.set_visible(False)
+        self.refresh_curve()
+        self.edited.emit()
+
+    def refresh_curve(self):
+        # Redraw the kept points after the mask changed, keeping the current smoothing
+        kept = self.mask.kept
+        self.smoothed.set_data(self.y_data[kept])
+        y = self.smoothed.y
+        if self.smoothing_applied:
+            try:
+                y = self.smoothed.smooth(self.smoothing_slider.value())
+            except ValueError:
+                pass
+
+        self.line.set_data(self.x_data[kept], y)
+        self.axes.relim()
+        self.axes.autoscale_view()
+        self.fig.canvas.draw_idle()
 
     def smooth_curve(self, value):
-        self.line.set_ydata(savgol_filter(self.y_data, value, 3))
+        self.show_smoothed(self.smoothed.smooth(value))
+
+    def show_smoothed(self, smoothed):
+        self.smoothing_applied = True
+        self.line.set_ydata(smoothed)
         self.axes.relim()
         self.axes.autoscale_view()
         self.fig.canvas.draw_idle()